@@ -170,6 +170,13 @@ class BasicAssembler:
         # Initialize a Particle Set instance to add individual particles to a stack
         particle_set = ParticleSet("BasicParticle", key=True)
 
+        # Collect the per-particle parameters to hand off to the particle set in one batch
+        orientations_to_simulate = []
+        orientations_to_save = []
+        noisy_orientations = []
+        coordinates_to_simulate = []
+        coordinates_to_save = []
+
         for i in range(num_particles):
             # Get particle coordinates, with random errors applied for this tiltseries, if desired
             coordinates = self.simulation.parse_coordinates()
@@ -208,15 +215,14 @@ class BasicAssembler:
                 # Update metadata records for changed orientations
                 custom_metadata["true_orientations"].append(true_orientation)
 
-                particle_set.add_orientation_to_simulate(
-                    true_orientation, noisy_version=noisy_orientation
-                )
+                orientations_to_simulate.append(true_orientation)
+                noisy_orientations.append(noisy_orientation)
             else:
-                particle_set.add_orientation_to_simulate(true_orientation)
-                particle_set.add_orientation_to_save(true_orientation)
+                orientations_to_simulate.append(true_orientation)
+                orientations_to_save.append(true_orientation)
 
-            particle_set.add_coordinate_to_simulate(coordinates["true_coordinates"][i])
-            particle_set.add_coordinate_to_save(coordinates["coordinates"][i])
+            coordinates_to_simulate.append(coordinates["true_coordinates"][i])
+            coordinates_to_save.append(coordinates["coordinates"][i])
 
             if "coord_error" in self.custom_args:
                 custom_metadata["true_coordinates"].append(
@@ -224,12 +230,19 @@ class BasicAssembler:
                 )
 
             particle_set.add_source(new_particle)
-            particle_set.num_particles += 1
 
             custom_metadata["your_custom_information_to_log"].append(
                 "some_custom_log_info"
             )
 
+        particle_set.add_particles(
+            coordinates_to_simulate,
+            orientations_to_simulate,
+            coordinates_to_save=coordinates_to_save,
+            orientations_to_save=orientations_to_save,
+            noisy_orientations=noisy_orientations,
+        )
+
         # Now send off the Chimera commands you have compiled for this stack off to the Chimera
         # server to be processed (if we used Chimera, as use_common_map mode will not
         if not self.custom_args["use_common_model"]:
@@ -425,7 +425,7 @@ class T4SSAssembler:
             # We use a new particle "set" per particle, since each will come from a slightly
             # different source map (based on randomized angles/position with respect to the
             # membrane)
-            particle_set = ParticleSet("T4SS%d" % (i + 1), key=True)
+            particle_set = ParticleSet.acquire("T4SS%d" % (i + 1), key=True)
 
             new_particle = truth_vols_dir + "/%d.mrc" % i
 
@@ -475,7 +475,6 @@ class T4SSAssembler:
                     coordinates["true_coordinates"][i]
                 )
             particle_set.add_source(new_particle)
-            particle_set.num_particles += 1
 
             custom_metadata["shifts_from_membrane_center"].append(position)
             custom_metadata["angles_from_membrane_perpendicular"].append(angles)
@@ -489,6 +488,10 @@ class T4SSAssembler:
         # Apply completed particle set to TEM-Simulator configs
         self.simulation.create_particle_lists(particle_sets)
 
+        # The particle set contents have been written out, so they can be reused for the next stack
+        for particle_set in particle_sets:
+            particle_set.release()
+
         self.simulation.set_custom_data(custom_metadata)
 
     def reset_temp_dir(self):
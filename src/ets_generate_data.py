@@ -15,13 +15,15 @@ Kyung Min Shin, 2020
 import time
 import os
 import multiprocessing
-from shutil import rmtree, copyfile
+from shutil import rmtree
 import argparse
 import json
 import requests
 import logging
 from logging import handlers
 import signal
+import tarfile
+import tempfile
 import warnings
 
 # External modules
@@ -39,6 +41,10 @@ from simulation.logger import log_listener_process, metadata_log_listener_proces
 
 assembler_registry = {"basic": BasicAssembler, "t4ss": T4SSAssembler}
 
+# Extract the templates with the safe "data" filter on Pythons whose tarfile supports it, which
+# also avoids the Python 3.12+ DeprecationWarning about the default extraction filter
+templates_extract_args = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+
 
 def configure_root_logger(queue):
     """Helper function to initialize and configure the main logger instance to handle log messages.
@@ -103,6 +109,31 @@ def scale_mrc(filename, apix=1.0):
             mrc.voxel_size = apix
 
 
+def pack_templates(coord_file, config_file, templates_tar_path):
+    """Pack the TEM-Simulator template files into a tar file, to be extracted into each child
+    process's temp dir.
+
+    The packed files are given a plain 0o644 mode instead of that of the originals, so that
+    read-only templates can still be extracted over the previous temp copies for each new stack.
+
+    Args:
+        coord_file: The template particle coordinates file
+        config_file: The template TEM-Simulator configuration file
+        templates_tar_path: The tar file to create
+
+    Returns: None
+
+    """
+
+    def reset_mode(tarinfo):
+        tarinfo.mode = 0o644
+        return tarinfo
+
+    with tarfile.open(templates_tar_path, "w") as templates_tar:
+        templates_tar.add(coord_file, arcname="coord.txt", filter=reset_mode)
+        templates_tar.add(config_file, arcname="sim.txt", filter=reset_mode)
+
+
 def get_defocus_value(defocuses, global_stack_no):
     num_defocuses = len(defocuses)
     return defocuses[global_stack_no % num_defocuses]
@@ -147,11 +178,12 @@ def run_process(
     logger.info("Making process temp dir: %s" % process_temp_dir)
 
     # Copy over TEM-Simulator input files so it doesn't interfere with
-    # any other potentially running simulations
+    # any other potentially running simulations. The templates are packed once by the main process,
+    # so each (re)set of the temp copies is a single streamed extract rather than separate copies.
     new_coord_file = process_temp_dir + "/coord.txt"
     new_input_file = process_temp_dir + "/sim.txt"
-    copyfile(configs["coord"], new_coord_file)
-    copyfile(configs["config"], new_input_file)
+    templates_tar = tarfile.open(configs["templates_tar"], "r")
+    templates_tar.extractall(path=process_temp_dir, **templates_extract_args)
     coord_error = None
     if "custom_configs" in configs and "coord_error" in configs["custom_configs"]:
         coord_error = configs["custom_configs"]["coord_error"]
@@ -246,8 +278,7 @@ def run_process(
         metadata_queue.put(metadata_message)
 
         # Reset temporary copies of template files
-        copyfile(configs["coord"], coord_file)
-        copyfile(configs["config"], sim_input_file)
+        templates_tar.extractall(path=process_temp_dir, **templates_extract_args)
 
         sim.close()
 
@@ -256,6 +287,8 @@ def run_process(
             logger.debug("Closing Assembler")
             assembler.close()
 
+    templates_tar.close()
+
     # Clean up temp files
     logger.debug("Removing temp dir")
     rmtree(process_temp_dir)
@@ -392,6 +425,29 @@ def main(configs):
         )
         exit(1)
 
+    # Pack the TEM-Simulator template files once, to be extracted into each child's temp dir. The
+    # tar is kept in a temporary directory outside the project root, which is removed however the
+    # run ends
+    templates_dir = tempfile.mkdtemp(prefix="ets_templates_")
+    configs["templates_tar"] = os.path.join(templates_dir, "templates.tar")
+    try:
+        pack_templates(configs["coord"], configs["config"], configs["templates_tar"])
+        run_processes(configs)
+    finally:
+        rmtree(templates_dir, ignore_errors=True)
+
+    logs_queue.put("END")
+    log_listener.join()
+
+
+def run_processes(configs):
+    """Spawn the metadata logging, Chimera server and simulation processes, and wait for the
+    simulations to complete.
+
+    Returns: None
+
+    """
+
     # Set up parallel processes
     if "num_cores" not in configs:
         num_cores = min(multiprocessing.cpu_count(), configs["num_stacks"])
@@ -539,9 +595,6 @@ def main(configs):
     #     send_email("kshin@umbriel.jensen.caltech.edu", configs["email"],
     #                "Simulation complete", 'Total time taken: %0.3f minutes' % time_taken)
 
-    logs_queue.put("END")
-    log_listener.join()
-
 
 logger = None
 start_time = time.time()
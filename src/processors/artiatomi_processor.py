@@ -3,9 +3,59 @@ import os
 import sys
 import re
 import json
+import functools
 from scipy.spatial.transform import Rotation as R
 import shutil
 import struct
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import mmap
+
+# orjson is optional, but speeds up loading large metadata files if available
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Match the header line of a template script's input parameters section, and the
+# assignment lines within it
+_RE_INPUT_PARAMS = re.compile(r"^%% Input parameters.*\n?", re.M)
+_RE_ASSIGN = re.compile(r"^.+ =.*\n?", re.M)
+
+# Match the header lines which end the input parameters section of each template script
+_RE_PROCESS = re.compile(r"^%% Process.*\n?", re.M)
+_RE_LOAD_MOTL = re.compile(r"^%% Load motl.*\n?", re.M)
+_RE_SPLIT_LATEST = re.compile(r"^%% Split latest.*\n?", re.M)
+_RE_RUN_EXTRACTIONS = re.compile(r"^%% Run extractions.*\n?", re.M)
+
+# Match the numbered references and motivelists written out by Artiatomi STA runs
+_RE_REF = re.compile(r"ref(\d+)\.em$")
+_RE_MOTL = re.compile(r"motl_(\d+)\.em$")
+
+# Matches the IMOD .mod file chunk IDs which get_slicer_info needs to act on
+_RE_MOD_TOKENS = re.compile(b"SLAN|OBJT|IEOF")
+
+# The Slicer angles and XYZ center stored in a SLAN chunk, as big-endian floats
+_SLAN_STRUCT = struct.Struct(">6f")
+
+# The IMOD project files copied over for Artiatomi processing
+_IMOD_FILE_SUFFIXES = (".tlt", ".st", ".xf", ".mod")
+
+# The Artiatomi template files, found relative to the ETSimulations script being run
+_TEMPLATES_DIR = os.path.realpath(
+    os.path.join(
+        os.path.dirname(os.path.abspath(sys.argv[0])), "..", "templates", "artiatomi"
+    )
+)
+
+# Rotation by 90 degrees around the x-axis, applied to Slicer orientations
+_ROT_X_90 = R.from_euler("zxz", [0, 90, 0], degrees=True)
+
+
+class ArtiaProcessingError(Exception):
+    """
+    Raised when an Artiatomi project cannot be set up from the given inputs, so that callers
+        processing several projects can recover instead of the whole process exiting
+    """
 
 
 #################################
@@ -13,52 +63,44 @@ import struct
 #################################
 
 
-def rotate_positions_around_z(positions):
+def _load_json(file):
     """
-    Given a list of coordinates, rotate them all by 90 degrees around the z-axis. This is used to
-        convert particle coordinates from the raw tiltseries to the final reconstruction's
-        coordinate system for simulated data.
+    Parse a JSON file, using orjson if it is installed since it is considerably faster than the
+        standard library parser for large simulation metadata files
 
     Args:
-        positions: A list of [x, y, z] coordinates
+        file: The JSON file, opened in binary mode
 
-    Returns: None
+    Returns: The parsed JSON object
 
     """
-    rot = R.from_euler("zxz", (90, 0, 0), degrees=True)
-    for i, point in enumerate(positions):
-        positions[i] = np.dot(rot.as_matrix(), np.array(point))
+    if orjson is not None:
+        return orjson.loads(file.read())
 
-    return positions
+    return json.load(file)
 
 
 def convert_slicer_to_motl(orientations):
     """
     Convert a set of Slicer angles to the reference-to-particle ZXZ, external Euler angles for Artiatomi
     Args:
-        orientations: The list of Slicer angles
+        orientations: The list or (N, 3) array of Slicer angles
 
-    Returns: The list of Euler angles
+    Returns: The (N, 3) array of Euler angles
 
     """
-    for i, point in enumerate(orientations):
-        slicer = orientations[i]
-        # Rotate by 90 around the x-axis so that the membrane is in the XY
-        # plane (Phi gives in-plane rotation)
-        slicer_rot = R.from_euler(
-            "zyx", [slicer[2], slicer[1], slicer[0]], degrees=True
-        )
-        orientation_mat = np.dot(
-            R.from_euler("zxz", [0, 90, 0], degrees=True).as_matrix(),
-            slicer_rot.as_matrix(),
-        )
-        rotation = R.from_matrix(orientation_mat)
-        ref_to_part = rotation.inv()
-        eulers = ref_to_part.as_euler("zxz", degrees=True)
-        # Like PEET, Artiatomi takes Z1, Z2, X
-        orientations[i] = [eulers[0], eulers[2], eulers[1]]
+    orientations = np.asarray(orientations, dtype=np.float64).reshape(-1, 3)
+    if len(orientations) == 0:
+        return orientations
 
-    return orientations
+    # Rotate by 90 around the x-axis so that the membrane is in the XY
+    # plane (Phi gives in-plane rotation)
+    slicer_rot = R.from_euler("zyx", orientations[:, ::-1], degrees=True)
+    rotation = _ROT_X_90 * slicer_rot
+    ref_to_part = rotation.inv()
+    eulers = ref_to_part.as_euler("zxz", degrees=True)
+    # Like PEET, Artiatomi takes Z1, Z2, X
+    return eulers[:, [0, 2, 1]]
 
 
 def get_slicer_info(mod_file):
@@ -68,47 +110,130 @@ def get_slicer_info(mod_file):
     Args:
         mod_file: The .mod file path
 
-    Returns: A list of Slicer point objects with keys {"angles", "coords"}
+    Returns: A tuple of (N, 3) arrays (coords, angles) of the Slicer point coordinates and their
+        (x, y, z) Slicer angles
 
     """
     results = []
     with open(mod_file, "rb") as file:
         token = file.read(4)
         if token != b"IMOD":
-            print(
-                "ID of .mod file is not 'IMOD'. This does not seem to be an IMOD MOD file!"
+            raise ArtiaProcessingError(
+                "ID of %s is not 'IMOD'. This does not seem to be an IMOD MOD file!"
+                % mod_file
             )
-            exit(1)
 
-        # Read past rest of ID and file header
-        file.read(236)
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            # Start scanning for tokens just before the end of the ID and file header
+            pos = 237
+            while True:
+                match = _RE_MOD_TOKENS.search(buf, pos)
+                if match is None or match.group() == b"IEOF":
+                    break
 
-        while token != b"IEOF":
-            file.seek(-3, 1)
-            token = file.read(4)
-            if token == b"SLAN":
-                # Read past SLAN object size and time
-                file.read(8)
+                pos = match.start()
+                if match.group() == b"SLAN":
+                    # Fail on a truncated SLAN chunk rather than reading past the file
+                    if pos + 12 + _SLAN_STRUCT.size > len(buf):
+                        raise ArtiaProcessingError(
+                            "Found a truncated SLAN chunk in MOD file: %s" % mod_file
+                        )
 
-                angles = struct.unpack(">" + ("f" * 3), file.read(4 * 3))
-                xyz = struct.unpack(">" + ("f" * 3), file.read(4 * 3))
+                    # Skip the SLAN token, object size and time
+                    slan = _SLAN_STRUCT.unpack_from(buf, pos + 12)
 
-                results.append({"angles": angles, "coords": xyz})
-                file.read(32)
+                    results.append(slan)
 
-                # Read forward a little so next iteration of while loop starts at end of SLAN object
-                file.read(3)
-            elif token == b"OBJT":
-                # Objects are 176 bytes; skip path to make reading faster
-                file.read(176)
-                # Read forward a little so next iteration of while loop starts at end of object
-                file.read(3)
+                    # Continue scanning at the end of the SLAN object
+                    pos += 68
+                else:
+                    # Objects are 180 bytes including the token; skip past to make reading faster
+                    pos += 180
 
     if len(results) == 0:
-        print("Reached end of MOD file without finding slicer angles!")
-        exit(1)
+        raise ArtiaProcessingError(
+            "Reached end of MOD file without finding slicer angles: %s" % mod_file
+        )
+
+    # Each SLAN chunk holds the three angles followed by the three coordinates
+    slans = np.array(results)
+    return slans[:, 3:], slans[:, :3]
+
+
+def _rewrite_template(template, end_marker, values, artia_args):
+    """
+    Rewrite the input parameters section of a Matlab template script
+
+    Text before the "%% Input parameters" header and after the end_marker header is passed
+    through unchanged, while the header lines themselves are dropped. Assignments within the
+    section are filled in from values, falling back on the processor arguments.
+
+    Args:
+        template: The full text of the template script
+        end_marker: The compiled pattern for the header line which ends the input parameters
+            section
+        values: A dictionary of string values (written out quoted) for variables not taken from
+            artia_args
+        artia_args: The Artiatomi Processor arguments
+
+    Returns: The text of the new script
+
+    """
+    start = _RE_INPUT_PARAMS.search(template)
+    if start is None:
+        return template
+
+    end = end_marker.search(template, start.end())
+    if end is None:
+        section_end = post_start = len(template)
+    else:
+        section_end, post_start = end.span()
+
+    # Format every value once up front, so each assignment is a single lookup
+    formatted = {
+        name: f"'{value}';" if isinstance(value, str) else str(value) + ";"
+        for name, value in artia_args.items()
+    }
+    formatted.update((name, f"'{value}';") for name, value in values.items())
+
+    def fill_in_assignment(match):
+        variable_name = match.group(0).strip().partition(" ")[0]
+
+        value_to_write_out = formatted.get(variable_name)
+        if value_to_write_out is None:
+            raise ArtiaProcessingError(
+                "Missing Artiatomi processing parameter: %s" % variable_name
+            )
 
-    return results
+        return " ".join([variable_name, "=", value_to_write_out, "\n"])
+
+    # Replace every assignment line in the section in one pass, leaving comments as they are
+    section = _RE_ASSIGN.sub(fill_in_assignment, template[start.end() : section_end])
+
+    return template[: start.start()] + section + template[post_start:]
+
+
+def _generate_matlab_script(template_name, new_script, end_marker, values, artia_args):
+    """
+    Create a Matlab script from one of the Artiatomi templates, filling in its input parameters
+
+    Args:
+        template_name: The file name of the template within the templates/artiatomi folder
+        new_script: The path of the script to create
+        end_marker: The compiled pattern for the header line which ends the template's input
+            parameters section
+        values: A dictionary of string values for variables not taken from artia_args
+        artia_args: The Artiatomi Processor arguments
+
+    Returns: None
+
+    """
+    with open(os.path.join(_TEMPLATES_DIR, template_name), "r") as base_file:
+        template = base_file.read()
+
+    script = _rewrite_template(template, end_marker, values, artia_args)
+    with open(new_script, "w") as new_file:
+        new_file.write(script)
 
 
 #######################
@@ -128,20 +253,26 @@ def imod_setup_sta(artia_root, dirs_start_with):
     """
 
     lines = ["Directory Tomonum Motl\n"]
-    for subdir in os.listdir(artia_root):
-        if subdir.startswith(dirs_start_with):
-            motl_name = ""
-            full_subdir = os.path.join(artia_root, subdir)
-            for file in os.listdir(full_subdir):
-                if file.endswith(".st"):
-                    basename = file.split(".")[0]
+    with os.scandir(artia_root) as it:
+        for entry in it:
+            if entry.name.startswith(dirs_start_with) and entry.is_dir(
+                follow_symlinks=False
+            ):
+                full_subdir = entry.path
+                with os.scandir(full_subdir) as inner:
+                    stack = next(
+                        (f.name for f in inner if f.name.endswith(".st")), None
+                    )
+
+                motl_name = ""
+                if stack is not None:
+                    basename = stack.split(".")[0]
                     motl_name = f"{basename}_motl.em"
-                    break
 
-            motl = os.path.join(artia_root, subdir, motl_name)
-            tomo_num = int(subdir.split("_")[-1]) + 1
+                motl = f"{full_subdir}{os.sep}{motl_name}"
+                tomo_num = int(entry.name.rpartition("_")[2]) + 1
 
-            lines.append(f"{full_subdir} {tomo_num} {motl}\n")
+                lines.append(f"{full_subdir} {tomo_num} {motl}\n")
 
     info_file = os.path.join(artia_root, "tomo_motls.txt")
 
@@ -151,25 +282,64 @@ def imod_setup_sta(artia_root, dirs_start_with):
     return info_file
 
 
-def shift_coordinates_bottom_left(coords, size, binning=1):
+def load_slicer_angles(slicer_angles_csv):
     """
-    Given an XYZ tuple of particle coordinates and the reconstruction they came from, shift the
-        coordinates so that the origin is at the bottom-left of the tomogram
+    Read a slicer angles CSV written by the IMOD Processor. The whole file is split and converted
+        to floats in one NumPy call rather than parsed line by line like np.loadtxt does.
 
     Args:
-        coords: the (x, y, z) coordinates for the particle
-        size: the reconstruction MRC half-dimensions in (nx/2, ny/2, nz/2) form
-        binning: the bin factor from the original stack to the final reconstruction, to be used if
-            you are using coordinates based on the original unbinned coordinate system
+        slicer_angles_csv: The CSV file path, with one row of three Slicer angles per particle
 
-    Returns: the new coordinates as a (x, y, z) tuple
+    Returns: An (N, 3) array of Slicer angles
 
     """
-    return (
-        float(coords[0]) / binning + size[0],
-        float(coords[1]) / binning + size[1],
-        float(coords[2]) / binning + size[2],
-    )
+    with open(slicer_angles_csv, "r") as f:
+        tokens = f.read().replace(",", " ").split()
+
+    return np.array(tokens, dtype=np.float64).reshape(-1, 3)
+
+
+def _write_out_motl_files_simulated_tomogram(
+    tomogram, root, name, xyz_name, motl_name, size, binning
+):
+    """
+    Set up the Artiatomi MOTL text files for a single tomogram of a simulated project
+
+    Args:
+        tomogram: The simulation metadata entry for the tomogram
+        root: The ETSimulations project root
+        name: The project/particle name
+        xyz_name: The file name to give the XYZ coordinates file
+        motl_name: The file name to give the Euler angles file
+        size: Final tomogram size (for shifting origin of coordinates)
+        binning: The binning to apply to the raw coordinates
+
+    Returns: None
+    """
+    basename = "%s_%d" % (name, tomogram["global_stack_no"])
+    tomogram_dir = os.path.join(root, "processed_data/IMOD", basename)
+
+    artia_dir = os.path.join(root, "processed_data/Artiatomi", basename)
+
+    # Positions for TEM-Simulator are in nm, need to convert to pixels. During reconstruction,
+    # there is also a 90 degree rotation around the z-axis, (x, y, z) -> (-y, x, z), and the
+    # origin must be shifted to the bottom-left, so do all three in one pass over the array
+    positions = np.asarray(tomogram["positions"], dtype=np.float64).reshape(-1, 3)
+    scale = tomogram["apix"] * binning
+    coords = np.empty_like(positions)
+    coords[:, 0] = -positions[:, 1] / scale + size[0]
+    coords[:, 1] = positions[:, 0] / scale + size[1]
+    coords[:, 2] = positions[:, 2] / scale + size[2]
+
+    slicer_angles_csv = os.path.join(tomogram_dir, "%s_slicerAngles.csv" % name)
+    orientations = load_slicer_angles(slicer_angles_csv)
+    eulers = convert_slicer_to_motl(orientations)
+
+    # Write out MOTL files for the tomogram
+    xyz_motl = os.path.join(artia_dir, xyz_name)
+    eulers_motl = os.path.join(artia_dir, motl_name)
+    np.savetxt(xyz_motl, coords, fmt="%f")
+    np.savetxt(eulers_motl, eulers, fmt="%f")
 
 
 def write_out_motl_files_simulated(root, name, xyz_name, motl_name, size, binning):
@@ -188,163 +358,247 @@ def write_out_motl_files_simulated(root, name, xyz_name, motl_name, size, binnin
     """
     metadata_file = os.path.join(root, "sim_metadata.json")
 
-    with open(metadata_file, "r") as f:
-        metadata = json.loads(f.read())
-
-        # -------------------------------------
-        # Retrieve parameters to write to files
-        # -------------------------------------
-        for num, tomogram in enumerate(metadata):
-            basename = "%s_%d" % (name, tomogram["global_stack_no"])
-            tomogram_dir = os.path.join(root, "processed_data/IMOD", basename)
-
-            artia_dir = os.path.join(root, "processed_data/Artiatomi", basename)
-
-            # Positions for TEM-Simulator are in nm, need to convert to pixels
-            positions = np.array(tomogram["positions"]) / tomogram["apix"]
-            # During reconstruction, there is a 90 degree rotation around the z-axis, so correct for
-            # that with the positions
-            positions = rotate_positions_around_z(positions)
-
-            slicer_angles_csv = os.path.join(tomogram_dir, "%s_slicerAngles.csv" % name)
-            orientations = np.loadtxt(slicer_angles_csv, delimiter=",")
-            eulers = convert_slicer_to_motl(orientations)
-            # Compile Slicer infos
-            slicer_info = []
-            for i, coords in enumerate(positions):
-                angles = eulers[i]
-                slicer_info.append({"coords": coords, "angles": angles})
-
-            # Write out MOTL files for each tomogram
-            xyz_motl = os.path.join(artia_dir, xyz_name)
-            eulers_motl = os.path.join(artia_dir, motl_name)
-            xyz_motl_file = open(xyz_motl, "w")
-            eulers_motl_file = open(eulers_motl, "w")
-            for info in slicer_info:
-                coords = shift_coordinates_bottom_left(info["coords"], size, binning)
-                angles = info["angles"]
-                xyz_line = "{:f} {:f} {:f}\n".format(coords[0], coords[1], coords[2])
-                xyz_motl_file.write(xyz_line)
-                motl_line = "{:f} {:f} {:f}\n".format(angles[0], angles[1], angles[2])
-                eulers_motl_file.write(motl_line)
-
-            xyz_motl_file.close()
-            eulers_motl_file.close()
-
-
-def write_out_motl_files_real(artia_root, xyz_name, motl_name):
+    # Only keep the fields the workers need, so the rest of the metadata (particle coordinates,
+    # orientations, custom data, etc.) is freed here instead of being pickled to the workers
+    with open(metadata_file, "rb") as f:
+        tomograms = [
+            {key: tomogram[key] for key in ("global_stack_no", "apix", "positions")}
+            for tomogram in _load_json(f)
+        ]
+
+    # Each tomogram's files are independent, so process them in parallel
+    write_tomogram = functools.partial(
+        _write_out_motl_files_simulated_tomogram,
+        root=root,
+        name=name,
+        xyz_name=xyz_name,
+        motl_name=motl_name,
+        size=size,
+        binning=binning,
+    )
+    with ProcessPoolExecutor() as executor:
+        # Consume the results so that any errors from the workers are raised here
+        list(executor.map(write_tomogram, tomograms))
+
+
+def _write_out_motl_files_real_tomogram(subdir_path, xyz_name, motl_name):
+    """
+    Set up the Artiatomi MOTL text files for a single tomogram directory of a real data project,
+        based on its slicer .mod file
+
+    Args:
+        subdir_path: The tomogram directory within the Artiatomi project
+        xyz_name: The file name to give the XYZ coordinates file
+        motl_name: The file name to give the Euler angles file
+
+    Returns: None
+    """
+    # Find the mod file
+    with os.scandir(subdir_path) as files:
+        mod_file = next((f.path for f in files if f.name.endswith(".mod")), "")
+
+    if mod_file == "":
+        raise ArtiaProcessingError(
+            "No mod was found for sub-directory: %s" % os.path.basename(subdir_path)
+        )
+
+    coords, angles = get_slicer_info(mod_file)
+
+    # Write out MOTL files for the tomogram, with the angles in Z1, Z2, X order
+    xyz_motl = os.path.join(subdir_path, xyz_name)
+    eulers_motl = os.path.join(subdir_path, motl_name)
+    np.savetxt(xyz_motl, coords, fmt="%f")
+    np.savetxt(eulers_motl, angles[:, [0, 2, 1]], fmt="%f")
+
+
+def write_out_motl_files_real(artia_root, dirs_start_with, xyz_name, motl_name):
     """
     Iterate through Artiatomi files copied over from IMOD real data and set up text files for Artiatomi to read in for
         its marker files based on slicer .mod files
 
     Args:
         artia_root: The Artiatomi project root
+        dirs_start_with: A prefix for the data subdirectories within the Artiatomi project
         xyz_name: The file name to give each XYZ coordinates file
         motl_name: The file name to give each Euler angles file
 
     Returns: None
     """
-    for subdir in os.listdir(artia_root):
-        # Find the mod file
-        mod_file = ""
-        for file in os.listdir(os.path.join(artia_root, subdir)):
-            if file.endswith(".mod"):
-                mod_file = os.path.join(artia_root, subdir, file)
-                break
+    # Skip over anything else in the project root, like scripts and the STA directories
+    with os.scandir(artia_root) as it:
+        subdir_paths = [
+            entry.path
+            for entry in it
+            if entry.name.startswith(dirs_start_with)
+            and entry.is_dir(follow_symlinks=False)
+        ]
+
+    # Each tomogram's files are independent, so process them in parallel
+    write_tomogram = functools.partial(
+        _write_out_motl_files_real_tomogram, xyz_name=xyz_name, motl_name=motl_name
+    )
+    with ProcessPoolExecutor() as executor:
+        # Consume the results so that any errors from the workers are raised here
+        list(executor.map(write_tomogram, subdir_paths))
 
-        if mod_file == "":
-            print("ERROR: No mod was found for sub-directory: %s" % subdir)
-            exit(1)
 
-        slicer_info = get_slicer_info(mod_file)
+def _copy_file(src, dst, link=False):
+    """
+    Copy a file, letting the kernel move the data where possible instead of copying through
+        userspace buffers. An up-to-date copy left by a previous run is not copied again.
+
+    Args:
+        src: The file to copy
+        dst: The destination path
+        link: If True, hard link the destination to the source instead of copying when the two are
+            on the same filesystem. Only use this if neither copy will be modified in place.
 
-        # Write out MOTL files for each tomogram
-        xyz_motl = os.path.join(artia_root, subdir, xyz_name)
-        eulers_motl = os.path.join(artia_root, subdir, motl_name)
-        xyz_motl_file = open(xyz_motl, "w")
-        eulers_motl_file = open(eulers_motl, "w")
-        for info in slicer_info:
-            coords = info["coords"]
-            angles = info["angles"]
-            xyz_line = "{:f} {:f} {:f}\n".format(coords[0], coords[1], coords[2])
-            xyz_motl_file.write(xyz_line)
-            motl_line = "{:f} {:f} {:f}\n".format(angles[0], angles[2], angles[1])
-            eulers_motl_file.write(motl_line)
+    Returns: None
+
+    """
+    # Nothing to do if the destination is already the source (i.e. linked on a previous run), or
+    # is a complete copy made after the source was last modified (i.e. copied on a previous run)
+    try:
+        dst_stat = os.stat(dst)
+    except FileNotFoundError:
+        pass
+    else:
+        src_stat = os.stat(src)
+        if os.path.samestat(src_stat, dst_stat) or (
+            dst_stat.st_size == src_stat.st_size
+            and dst_stat.st_mtime >= src_stat.st_mtime
+        ):
+            return
+
+    if link:
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+
+    try:
+        with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+            remaining = os.fstat(src_file.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(
+                    src_file.fileno(), dst_file.fileno(), remaining
+                )
+                if copied == 0:
+                    break
+                remaining -= copied
+        if remaining == 0:
+            return
+    except (AttributeError, OSError):
+        pass
 
-        xyz_motl_file.close()
-        eulers_motl_file.close()
+    # Fall back on a regular copy if the kernel could not copy the file for us
+    shutil.copyfile(src, dst)
 
 
-def copy_over_imod_files(
-    imod_root, artia_root, dir_starts_with, real_data_mode=False, mod_contains=None
+def _copy_over_imod_files_tomogram(
+    subdir_path, artia_root, real_data_mode, mod_contains, link_files
 ):
-    for subdir in os.listdir(imod_root):
-        if subdir.startswith(dir_starts_with):
-
-            # Look for the necessary IMOD files
-            xf = ""
-            tlt = ""
-            stack = ""
-            mod = ""
-            if not real_data_mode:
-                mod = "none"
-            for file in os.listdir(os.path.join(imod_root, subdir)):
-                if file.endswith(".tlt") and not file.endswith("_fid.tlt"):
-                    tlt = file
-                elif file.endswith(".st"):
-                    stack = file
-                elif file.endswith(".xf") and not file.endswith("_fid.xf"):
-                    xf = file
-                if real_data_mode and mod_contains in file and file.endswith(".mod"):
-                    mod = file
-
-                # Break out of loop once all three relevant files have been found
-                if tlt != "" and stack != "" and xf != "" and mod != "":
-                    break
+    """
+    Copy the IMOD files needed by Artiatomi for a single tomogram directory
 
-            artia_stack_dir = os.path.join(artia_root, subdir)
-            if not os.path.exists(artia_stack_dir):
-                os.mkdir(artia_stack_dir)
+    Args:
+        subdir_path: The tomogram directory within the IMOD project
+        artia_root: The Artiatomi project root
+        real_data_mode: Whether the mod file should also be copied over
+        mod_contains: A string the mod file name should contain (only used for real data)
+        link_files: Whether to hard link the files instead of copying them when possible
 
-            # Copy over the stack to the Artiatomi folder
-            if stack != "":
-                shutil.copyfile(
-                    os.path.join(imod_root, subdir, stack),
-                    os.path.join(artia_stack_dir, stack),
-                )
-            else:
-                print("ERROR: No tiltseries was found for sub-directory: %s" % subdir)
-                exit(1)
-
-            # Copy over the tlt file to the Artiatomi folder
-            if tlt != "":
-                shutil.copyfile(
-                    os.path.join(imod_root, subdir, tlt),
-                    os.path.join(artia_stack_dir, tlt),
-                )
-            else:
-                print("WARNING: No .tlt file was found for sub-directory: %s" % subdir)
-
-            # Copy over the tlt file to the Artiatomi folder
-            if xf != "":
-                shutil.copyfile(
-                    os.path.join(imod_root, subdir, xf),
-                    os.path.join(artia_stack_dir, xf),
-                )
-            else:
-                print("WARNING: No .xf file was found for sub-directory: %s" % subdir)
-
-            if real_data_mode:
-                # Copy over the mod file to the Artiatomi folder
-                if mod != "":
-                    shutil.copyfile(
-                        os.path.join(imod_root, subdir, mod),
-                        os.path.join(artia_stack_dir, mod),
-                    )
-                else:
-                    print(
-                        "WARNING: No .mod file was found for sub-directory: %s" % subdir
-                    )
+    Returns: None
+    """
+    subdir = os.path.basename(subdir_path)
+
+    # Look for the necessary IMOD files
+    xf = ""
+    tlt = ""
+    stack = ""
+    mod = ""
+    if not real_data_mode:
+        mod = "none"
+    with os.scandir(subdir_path) as files:
+        for f in files:
+            file = f.name
+            if not file.endswith(_IMOD_FILE_SUFFIXES):
+                continue
+
+            if file.endswith(".tlt") and not file.endswith("_fid.tlt"):
+                tlt = file
+            elif file.endswith(".st"):
+                stack = file
+            elif file.endswith(".xf") and not file.endswith("_fid.xf"):
+                xf = file
+            if real_data_mode and mod_contains in file and file.endswith(".mod"):
+                mod = file
+
+            # Break out of loop once all three relevant files have been found
+            if tlt != "" and stack != "" and xf != "" and mod != "":
+                break
+
+    artia_stack_dir = os.path.join(artia_root, subdir)
+    os.makedirs(artia_stack_dir, exist_ok=True)
+
+    # Join the directory prefixes once and build each file path from them
+    src_prefix = subdir_path + os.sep
+    dst_prefix = artia_stack_dir + os.sep
+
+    # Copy over the stack to the Artiatomi folder
+    if stack != "":
+        _copy_file(f"{src_prefix}{stack}", f"{dst_prefix}{stack}", link=link_files)
+    else:
+        raise ArtiaProcessingError(
+            "No tiltseries was found for sub-directory: %s" % subdir
+        )
+
+    # Copy over the tlt file to the Artiatomi folder
+    if tlt != "":
+        _copy_file(f"{src_prefix}{tlt}", f"{dst_prefix}{tlt}", link=link_files)
+    else:
+        print("WARNING: No .tlt file was found for sub-directory: %s" % subdir)
+
+    # Copy over the tlt file to the Artiatomi folder
+    if xf != "":
+        _copy_file(f"{src_prefix}{xf}", f"{dst_prefix}{xf}", link=link_files)
+    else:
+        print("WARNING: No .xf file was found for sub-directory: %s" % subdir)
+
+    if real_data_mode:
+        # Copy over the mod file to the Artiatomi folder
+        if mod != "":
+            _copy_file(f"{src_prefix}{mod}", f"{dst_prefix}{mod}", link=link_files)
+        else:
+            print("WARNING: No .mod file was found for sub-directory: %s" % subdir)
+
+
+def copy_over_imod_files(
+    imod_root,
+    artia_root,
+    dir_starts_with,
+    real_data_mode=False,
+    mod_contains=None,
+    link_files=False,
+):
+    with os.scandir(imod_root) as it:
+        subdir_paths = [
+            entry.path for entry in it if entry.name.startswith(dir_starts_with)
+        ]
+
+    # Copying is I/O bound and releases the GIL, so copy the tomograms over in parallel threads,
+    # capping the number of workers to avoid thrashing the disks
+    copy_tomogram = functools.partial(
+        _copy_over_imod_files_tomogram,
+        artia_root=artia_root,
+        real_data_mode=real_data_mode,
+        mod_contains=mod_contains,
+        link_files=link_files,
+    )
+    with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as executor:
+        # Consume the results so that any errors from the workers are raised here
+        list(executor.map(copy_tomogram, subdir_paths))
 
 
 def setup_reconstructions_script(root, name, artia_args):
@@ -362,8 +616,10 @@ def setup_reconstructions_script(root, name, artia_args):
     xyz_motl = "%s_xyz.txt" % name
     eulers_motl = "%s_motl.txt" % name
 
+    real_data_mode = artia_args["real_data_mode"]
+
     # Get input parameters based on mode
-    if artia_args["real_data_mode"]:
+    if real_data_mode:
         artia_root = artia_args["artia_dir"]
         imod_root = artia_args["imod_dir"]
         dir_starts_with = artia_args["dir_starts_with"]
@@ -378,20 +634,20 @@ def setup_reconstructions_script(root, name, artia_args):
     # Set up Artiatomi project directory structure
     # -------------------------------------
     print("Creating Artiatomi project directories and copying over relevant IMOD files")
-    if not os.path.exists(artia_root):
-        os.mkdir(artia_root)
+    os.makedirs(artia_root, exist_ok=True)
 
     copy_over_imod_files(
         imod_root,
         artia_root,
         dir_starts_with,
-        real_data_mode=artia_args["real_data_mode"],
+        real_data_mode=real_data_mode,
         mod_contains=mod_contains,
+        link_files=artia_args.get("link_imod_files", False),
     )
 
     print("Writing out MOTL-related files")
-    if artia_args["real_data_mode"]:
-        write_out_motl_files_real(artia_root, xyz_motl, eulers_motl)
+    if real_data_mode:
+        write_out_motl_files_real(artia_root, dir_starts_with, xyz_motl, eulers_motl)
     else:
         binning = 1
         if "position_binning" in artia_args:
@@ -405,72 +661,20 @@ def setup_reconstructions_script(root, name, artia_args):
         write_out_motl_files_simulated(root, name, xyz_motl, eulers_motl, size, binning)
 
     # Use template file to create Matlab script to run the remaining steps
-    current_dir = os.path.abspath(os.path.dirname(sys.argv[0]))
-    template = current_dir + "../../templates/artiatomi/setup_artia_reconstructions.m"
-    template_path = os.path.realpath(template)
     new_script = os.path.join(artia_root, "setup_artia_reconstructions.m")
     print("")
     print("Creating processing script at: %s" % new_script)
 
-    with open(new_script, "w") as new_file:
-        with open(template_path, "r") as base_file:
-            # First look for the input params section
-            while True:
-                line = base_file.readline()
-                if re.match(r"^%% Input parameters", line):
-                    break
-                else:
-                    new_file.write(line)
-
-            # Now start replacing input params
-            while True:
-                line = base_file.readline()
-                # Break once we reach the end of the segment
-                if re.match(r"^%% Process", line):
-                    break
-
-                # If we are at an assignment line
-                elif re.match(r".+ =", line):
-                    line = line.strip()
-                    tokens = line.split(" ")
-                    variable_name = tokens[0]
-
-                    value_to_write_out = ""
-                    if variable_name == "project_root":
-                        value_to_write_out = f"'{artia_root}';"
-                    elif variable_name == "dir_starts_with":
-                        value_to_write_out = f"'{dir_starts_with}';"
-                    elif variable_name == "xyz_motl":
-                        value_to_write_out = f"'{xyz_motl}';"
-                    elif variable_name == "eulers_motl":
-                        value_to_write_out = f"'{eulers_motl}';"
-                    elif variable_name in artia_args:
-                        if type(artia_args[variable_name]) == str:
-                            value_to_write_out = f"'{artia_args[variable_name]}';"
-                        else:
-                            value_to_write_out = str(artia_args[variable_name]) + ";"
-                    else:
-                        print(
-                            "Missing Artiatomi processing parameter: %s!"
-                            % variable_name
-                        )
-                        exit(1)
-
-                    new_line = " ".join([variable_name, "=", value_to_write_out, "\n"])
-
-                    new_file.write(new_line)
-
-                # Other lines in the segment - probably just comments
-                else:
-                    new_file.write(line)
-
-            # For the rest of the code, just write it out
-            while True:
-                line = base_file.readline()
-                if len(line) == 0:
-                    break
-                else:
-                    new_file.write(line)
+    # Values for the input parameters which are not taken directly from the processor arguments
+    values = {
+        "project_root": artia_root,
+        "dir_starts_with": dir_starts_with,
+        "xyz_motl": xyz_motl,
+        "eulers_motl": eulers_motl,
+    }
+    _generate_matlab_script(
+        "setup_artia_reconstructions.m", new_script, _RE_PROCESS, values, artia_args
+    )
 
 
 def generate_reconstructions_script(root, name, artia_args):
@@ -492,35 +696,30 @@ def generate_reconstructions_script(root, name, artia_args):
         dir_starts_with = name
 
     # Use template file to create a bash script to run EmSART on a data set
-    current_dir = os.path.abspath(os.path.dirname(sys.argv[0]))
-    template = current_dir + "../../templates/artiatomi/emsart_reconstruct.sh"
-    template_path = os.path.realpath(template)
+    template_path = os.path.join(_TEMPLATES_DIR, "emsart_reconstruct.sh")
     new_script = os.path.join(artia_root, "emsart_reconstruct.sh")
     print("")
     print("Creating processing script at: %s" % new_script)
 
+    with open(template_path, "r") as base_file:
+        lines = base_file.read().splitlines(keepends=True)
+
+    out_lines = []
+    for line in lines:
+        if line.startswith("for f in"):
+            dir_pattern = f"{artia_root}/{dir_starts_with}*"
+            out_lines.append(f"for f in {dir_pattern}\n")
+        elif line.startswith("config_file"):
+            config_file = os.path.basename(artia_args["reconstruction_template_config"])
+            out_lines.append(f'config_file="{config_file}"\n')
+        elif line.startswith("emsart_path"):
+            emsart = artia_args["emsart_path"]
+            out_lines.append(f'emsart_path="{emsart}"\n')
+        else:
+            out_lines.append(line)
+
     with open(new_script, "w") as new_file:
-        with open(template_path, "r") as base_file:
-            while True:
-                line = base_file.readline()
-                if len(line) == 0:
-                    break
-                elif line.startswith("for f in"):
-                    dir_pattern = f"{artia_root}/{dir_starts_with}*"
-                    new_line = f"for f in {dir_pattern}\n"
-                    new_file.write(new_line)
-                elif line.startswith("config_file"):
-                    config_file = os.path.basename(
-                        artia_args["reconstruction_template_config"]
-                    )
-                    new_line = f'config_file="{config_file}"\n'
-                    new_file.write(new_line)
-                elif line.startswith("emsart_path"):
-                    emsart = artia_args["emsart_path"]
-                    new_line = f'emsart_path="{emsart}"\n'
-                    new_file.write(new_line)
-                else:
-                    new_file.write(line)
+        new_file.writelines(out_lines)
 
 
 def generate_sta_script(artia_root, info_file, artia_args):
@@ -545,84 +744,25 @@ def generate_sta_script(artia_root, info_file, artia_args):
     cfg_file = os.path.join(sta_folder, "sta.cfg")
 
     # Use template file to create Matlab script to run the remaining steps
-    current_dir = os.path.abspath(os.path.dirname(sys.argv[0]))
-    template = current_dir + "../../templates/artiatomi/setup_artia_sta.m"
-    template_path = os.path.realpath(template)
     new_script = os.path.join(artia_root, "setup_artia_sta.m")
     print("")
     print("Creating STA processing script at: %s" % new_script)
 
-    with open(new_script, "w") as new_file:
-        with open(template_path, "r") as base_file:
-            # First look for the input params section
-            while True:
-                line = base_file.readline()
-                if re.match(r"^%% Input parameters", line):
-                    break
-                else:
-                    new_file.write(line)
-
-            # Now start replacing input params
-            while True:
-                line = base_file.readline()
-                # Break once we reach the end of the segment
-                if re.match(r"^%% Load motl", line):
-                    break
-
-                # If we are at an assignment line
-                elif re.match(r".+ =", line):
-                    line = line.strip()
-                    tokens = line.split(" ")
-                    variable_name = tokens[0]
-
-                    value_to_write_out = ""
-                    if variable_name == "info_file":
-                        value_to_write_out = f"'{info_file}';"
-                    elif variable_name == "sta_folder":
-                        value_to_write_out = f"'{sta_folder}';"
-                    elif variable_name == "maskFile":
-                        value_to_write_out = f"'{mask_file}';"
-                    elif variable_name == "wedgeFile":
-                        value_to_write_out = f"'{wedge_file}';"
-                    elif variable_name == "maskCCFile":
-                        value_to_write_out = f"'{maskCC_file}';"
-                    elif variable_name == "motlFile":
-                        value_to_write_out = f"'{global_motl_file}';"
-                    elif variable_name == "motlFilePre":
-                        value_to_write_out = f"'{motl_file_pre}';"
-                    elif variable_name == "particles_folder":
-                        value_to_write_out = f"'{particles_folder}';"
-                    elif variable_name == "partFilePre":
-                        value_to_write_out = f"'{part_file_pre}';"
-                    elif variable_name == "avgCfgFile":
-                        value_to_write_out = f"'{cfg_file}';"
-                    elif variable_name in artia_args:
-                        if type(artia_args[variable_name]) == str:
-                            value_to_write_out = f"'{artia_args[variable_name]}';"
-                        else:
-                            value_to_write_out = str(artia_args[variable_name]) + ";"
-                    else:
-                        print(
-                            "Missing Artiatomi processing parameter: %s!"
-                            % variable_name
-                        )
-                        exit(1)
-
-                    new_line = " ".join([variable_name, "=", value_to_write_out, "\n"])
-
-                    new_file.write(new_line)
-
-                # Other lines in the segment - probably just comments
-                else:
-                    new_file.write(line)
-
-            # For the rest of the code, just write it out
-            while True:
-                line = base_file.readline()
-                if len(line) == 0:
-                    break
-                else:
-                    new_file.write(line)
+    values = {
+        "info_file": info_file,
+        "sta_folder": sta_folder,
+        "maskFile": mask_file,
+        "wedgeFile": wedge_file,
+        "maskCCFile": maskCC_file,
+        "motlFile": global_motl_file,
+        "motlFilePre": motl_file_pre,
+        "particles_folder": particles_folder,
+        "partFilePre": part_file_pre,
+        "avgCfgFile": cfg_file,
+    }
+    _generate_matlab_script(
+        "setup_artia_sta.m", new_script, _RE_LOAD_MOTL, values, artia_args
+    )
 
 
 def get_latest_ref(sta_dir):
@@ -637,11 +777,14 @@ def get_latest_ref(sta_dir):
     ref_dir = os.path.join(sta_dir, "ref")
     max_num = 0
     latest_ref = None
-    for ref in os.listdir(ref_dir):
-        if re.match("ref[0-9]+.em", ref):
-            num = int(ref.split("ref")[1].split(".")[0])
-            if num > max_num:
-                latest_ref = os.path.join(ref_dir, ref)
+    with os.scandir(ref_dir) as it:
+        for entry in it:
+            match = _RE_REF.match(entry.name)
+            if match:
+                num = int(match.group(1))
+                if num > max_num:
+                    max_num = num
+                    latest_ref = entry.path
 
     return latest_ref
 
@@ -658,11 +801,14 @@ def get_latest_motl(sta_dir):
     motls_dir = os.path.join(sta_dir, "motls")
     max_num = 0
     latest_motl = None
-    for motl in os.listdir(motls_dir):
-        if re.match("motl_[0-9]+.em", motl):
-            num = int(motl.split("_")[1].split(".")[0])
-            if num > max_num:
-                latest_motl = os.path.join(motls_dir, motl)
+    with os.scandir(motls_dir) as it:
+        for entry in it:
+            match = _RE_MOTL.match(entry.name)
+            if match:
+                num = int(match.group(1))
+                if num > max_num:
+                    max_num = num
+                    latest_motl = entry.path
 
     return latest_motl
 
@@ -690,80 +836,23 @@ def generate_refinement_script(artia_root, info_file, artia_args):
     latest_motl = get_latest_motl(os.path.join(artia_root, "sta"))
 
     # Use template file to create Matlab script to run the remaining steps
-    current_dir = os.path.abspath(os.path.dirname(sys.argv[0]))
-    template = current_dir + "../../templates/artiatomi/refine_align.m"
-    template_path = os.path.realpath(template)
     new_script = os.path.join(artia_root, "refine_align.m")
     print("")
     print("Creating refinement script at: %s" % new_script)
 
-    with open(new_script, "w") as new_file:
-        with open(template_path, "r") as base_file:
-            # First look for the input params section
-            while True:
-                line = base_file.readline()
-                if re.match(r"^%% Input parameters", line):
-                    break
-                else:
-                    new_file.write(line)
-
-            # Now start replacing input params
-            while True:
-                line = base_file.readline()
-                # Break once we reach the end of the segment
-                if re.match(r"^%% Split latest", line):
-                    break
-
-                # If we are at an assignment line
-                elif re.match(r".+ =", line):
-                    line = line.strip()
-                    tokens = line.split(" ")
-                    variable_name = tokens[0]
-
-                    value_to_write_out = ""
-                    if variable_name == "info_file":
-                        value_to_write_out = f"'{info_file}';"
-                    elif variable_name == "mask_file":
-                        value_to_write_out = f"'{mask_file}';"
-                    elif variable_name == "wedge_file":
-                        value_to_write_out = f"'{wedge_file}';"
-                    elif variable_name == "maskCC_file":
-                        value_to_write_out = f"'{maskCC_file}';"
-                    elif variable_name == "main_root":
-                        value_to_write_out = f"'{refine_dir}';"
-                    elif variable_name == "refine_motls_dir":
-                        value_to_write_out = f"'{refine_motls_dir}';"
-                    elif variable_name == "latest_ref":
-                        value_to_write_out = f"'{latest_ref}';"
-                    elif variable_name == "latest_motl":
-                        value_to_write_out = f"'{latest_motl}';"
-                    elif variable_name in artia_args:
-                        if type(artia_args[variable_name]) == str:
-                            value_to_write_out = f"'{artia_args[variable_name]}';"
-                        else:
-                            value_to_write_out = str(artia_args[variable_name]) + ";"
-                    else:
-                        print(
-                            "Missing Artiatomi processing parameter: %s!"
-                            % variable_name
-                        )
-                        exit(1)
-
-                    new_line = " ".join([variable_name, "=", value_to_write_out, "\n"])
-
-                    new_file.write(new_line)
-
-                # Other lines in the segment - probably just comments
-                else:
-                    new_file.write(line)
-
-            # For the rest of the code, just write it out
-            while True:
-                line = base_file.readline()
-                if len(line) == 0:
-                    break
-                else:
-                    new_file.write(line)
+    values = {
+        "info_file": info_file,
+        "mask_file": mask_file,
+        "wedge_file": wedge_file,
+        "maskCC_file": maskCC_file,
+        "main_root": refine_dir,
+        "refine_motls_dir": refine_motls_dir,
+        "latest_ref": latest_ref,
+        "latest_motl": latest_motl,
+    }
+    _generate_matlab_script(
+        "refine_align.m", new_script, _RE_SPLIT_LATEST, values, artia_args
+    )
 
 
 def generate_extract_script(artia_root, artia_args):
@@ -785,143 +874,78 @@ def generate_extract_script(artia_root, artia_args):
     maskCC_file = os.path.join(artia_root, "sta", "other", "maskCC.em")
 
     # Use template file to create Matlab script to run the remaining steps
-    current_dir = os.path.abspath(os.path.dirname(sys.argv[0]))
-    template = current_dir + "../../templates/artiatomi/refine_extract.m"
-    template_path = os.path.realpath(template)
     new_script = os.path.join(artia_root, "refine_extract.m")
     print("")
     print("Creating refinement extraction script at: %s" % new_script)
 
-    with open(new_script, "w") as new_file:
-        with open(template_path, "r") as base_file:
-            # First look for the input params section
-            while True:
-                line = base_file.readline()
-                if re.match(r"^%% Input parameters", line):
-                    break
-                else:
-                    new_file.write(line)
-
-            # Now start replacing input params
-            while True:
-                line = base_file.readline()
-                # Break once we reach the end of the segment
-                if re.match(r"^%% Run extractions", line):
-                    break
-
-                # If we are at an assignment line
-                elif re.match(r".+ =", line):
-                    line = line.strip()
-                    tokens = line.split(" ")
-                    variable_name = tokens[0]
-
-                    value_to_write_out = ""
-                    if variable_name == "refineDir":
-                        value_to_write_out = f"'{refine_dir}';"
-                    elif variable_name == "subVolPre":
-                        value_to_write_out = f"'{subvol_pre}';"
-                    elif variable_name == "latestStaMotl":
-                        value_to_write_out = f"'{latest_motl}';"
-                    elif variable_name == "mask_file":
-                        value_to_write_out = f"'{mask_file}';"
-                    elif variable_name == "wedge_file":
-                        value_to_write_out = f"'{wedge_file}';"
-                    elif variable_name == "maskCC_file":
-                        value_to_write_out = f"'{maskCC_file}';"
-                    elif variable_name in artia_args:
-                        if type(artia_args[variable_name]) == str:
-                            value_to_write_out = f"'{artia_args[variable_name]}';"
-                        else:
-                            value_to_write_out = str(artia_args[variable_name]) + ";"
-                    else:
-                        print(
-                            "Missing Artiatomi processing parameter: %s!"
-                            % variable_name
-                        )
-                        exit(1)
-
-                    new_line = " ".join([variable_name, "=", value_to_write_out, "\n"])
-
-                    new_file.write(new_line)
-
-                # Other lines in the segment - probably just comments
-                else:
-                    new_file.write(line)
-
-            # For the rest of the code, just write it out
-            while True:
-                line = base_file.readline()
-                if len(line) == 0:
-                    break
-                else:
-                    new_file.write(line)
+    values = {
+        "refineDir": refine_dir,
+        "subVolPre": subvol_pre,
+        "latestStaMotl": latest_motl,
+        "mask_file": mask_file,
+        "wedge_file": wedge_file,
+        "maskCC_file": maskCC_file,
+    }
+    _generate_matlab_script(
+        "refine_extract.m", new_script, _RE_RUN_EXTRACTIONS, values, artia_args
+    )
 
 
 def artiatomi_main(root, name, artia_args):
 
-    if (
-        "setup_reconstructions_and_motls" in artia_args
-        and artia_args["setup_reconstructions_and_motls"]
-    ):
+    setup_averaging = artia_args.get("setup_averaging", False)
+    setup_refinement = artia_args.get("setup_refinement", False)
+
+    if artia_args.get("setup_reconstructions_and_motls", False):
         setup_reconstructions_script(root, name, artia_args)
 
         generate_reconstructions_script(root, name, artia_args)
 
-    if "setup_averaging" in artia_args and artia_args["setup_averaging"]:
-
-        # Get input parameters based on mode
+    # Get input parameters based on mode
+    if setup_averaging or setup_refinement:
         if artia_args["real_data_mode"]:
             artia_root = artia_args["artia_dir"]
-            dir_starts_with = artia_args["dir_starts_with"]
         else:
             artia_root = os.path.join(root, "processed_data", "Artiatomi")
+
+    if setup_averaging:
+        # Only averaging needs the data subdirectory prefix
+        if artia_args["real_data_mode"]:
+            dir_starts_with = artia_args["dir_starts_with"]
+        else:
             dir_starts_with = name
 
         # Set up averaging directory structure
         print("Creating Artiatomi averaging directories")
         sta_dir = os.path.join(artia_root, "sta")
-        if not os.path.exists(sta_dir):
-            os.mkdir(sta_dir)
+        os.makedirs(sta_dir, exist_ok=True)
 
         parts_dir = os.path.join(sta_dir, "parts")
-        if not os.path.exists(parts_dir):
-            os.mkdir(parts_dir)
+        os.makedirs(parts_dir, exist_ok=True)
 
         motls_dir = os.path.join(sta_dir, "motls")
-        if not os.path.exists(motls_dir):
-            os.mkdir(motls_dir)
+        os.makedirs(motls_dir, exist_ok=True)
 
         ref_dir = os.path.join(sta_dir, "ref")
-        if not os.path.exists(ref_dir):
-            os.mkdir(ref_dir)
+        os.makedirs(ref_dir, exist_ok=True)
 
         others_dir = os.path.join(sta_dir, "other")
-        if not os.path.exists(others_dir):
-            os.mkdir(others_dir)
+        os.makedirs(others_dir, exist_ok=True)
 
         info_file = imod_setup_sta(artia_root, dir_starts_with)
 
         generate_sta_script(artia_root, info_file, artia_args)
 
-    if "setup_refinement" in artia_args and artia_args["setup_refinement"]:
-
-        # Get input parameters based on mode
-        if artia_args["real_data_mode"]:
-            artia_root = artia_args["artia_dir"]
-        else:
-            artia_root = os.path.join(root, "processed_data", "Artiatomi")
-
+    if setup_refinement:
         info_file = os.path.join(artia_root, "tomo_motls.txt")
 
         # Set up averaging directory structure
         print("Creating Artiatomi refinement directories")
         refine_dir = os.path.join(artia_root, "refine")
-        if not os.path.exists(refine_dir):
-            os.mkdir(refine_dir)
+        os.makedirs(refine_dir, exist_ok=True)
 
         motls_dir = os.path.join(refine_dir, "motls")
-        if not os.path.exists(motls_dir):
-            os.mkdir(motls_dir)
+        os.makedirs(motls_dir, exist_ok=True)
 
         generate_refinement_script(artia_root, info_file, artia_args)
 
@@ -7,15 +7,45 @@ raw data from ets_generate_data.py through the Dynamo tomography pipeline.
 import os
 import sys
 import json
-import warnings
 from scipy.spatial.transform import Rotation as R
 import shutil
 import numpy as np
 import re
 import struct
+import mmap
 import shlex
 import subprocess
 import math
+import functools
+from concurrent.futures import ProcessPoolExecutor
+
+# orjson is optional, but speeds up loading large metadata files if available
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Matches the IMOD .mod file chunk IDs which get_slicer_info needs to act on
+_RE_MOD_TOKENS = re.compile(b"SLAN|OBJT|IEOF")
+
+# The Slicer angles and XYZ center stored in a SLAN chunk, as big-endian floats
+_SLAN_STRUCT = struct.Struct(">6f")
+
+# The nx, ny, nz dimensions at the start of an MRC header, in either byte order, and the number of
+# header bytes to read to also reach the machine stamp
+_MRC_SIZE_STRUCT_LE = struct.Struct("<3i")
+_MRC_SIZE_STRUCT_BE = struct.Struct(">3i")
+_MRC_HEADER_PREFIX_SIZE = 216
+
+# Match the header lines around the input parameters section of the template script, and the
+# assignment lines within it
+_RE_INPUT_PARAMS = re.compile(r"^%% Input parameters.*\n?", re.M)
+_RE_PROCESS_TABLE = re.compile(r"^%% Process table.*\n?", re.M)
+_RE_ASSIGN = re.compile(r"^.+=.*\n?", re.M)
+
+# Format for a row of a Dynamo .tbl file, giving the particle tag, the Euler angles, the tilt range,
+# the tomogram number and the particle coordinates, with all other columns held at their defaults
+_TBL_ROW_FORMAT = "%d 1 1 0 0 0 %.3f %.3f %.3f 0 0 0 1 %d %d 0 0 0 0 %d 0 0 0 %.3f %.3f %.3f 0 0 0 0 0 0"
 
 
 #################################
@@ -23,6 +53,23 @@ import math
 #################################
 
 
+def _load_json(file):
+    """
+    Load the processor info or simulation metadata JSON that the Dynamo Processor reads, with
+        orjson when it is available
+
+    Args:
+        file: The JSON file, opened in binary mode since orjson parses bytes
+
+    Returns: The parsed JSON object
+
+    """
+    if orjson is not None:
+        return orjson.loads(file.read())
+
+    return json.load(file)
+
+
 def rotate_positions_around_z(positions):
     """
     Given a list of coordinates, rotate them all by 90 degrees around the z-axis. This is used to
@@ -30,16 +77,19 @@ def rotate_positions_around_z(positions):
         coordinate system for simulated data.
 
     Args:
-        positions: A list of [x, y, z] coordinates
+        positions: A list or (N, 3) array of [x, y, z] coordinates
 
-    Returns: None
+    Returns: The rotated coordinates as an (N, 3) array
 
     """
-    rot = R.from_euler("zxz", (90, 0, 0), degrees=True)
-    for i, point in enumerate(positions):
-        positions[i] = np.dot(rot.as_matrix(), np.array(point))
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
 
-    return positions
+    # A 90 degree rotation around z is exactly (x, y, z) -> (-y, x, z)
+    rotated = np.empty_like(positions)
+    rotated[:, 0] = -positions[:, 1]
+    rotated[:, 1] = positions[:, 0]
+    rotated[:, 2] = positions[:, 2]
+    return rotated
 
 
 ######################################
@@ -47,10 +97,11 @@ def rotate_positions_around_z(positions):
 ######################################
 
 
+@functools.lru_cache(maxsize=None)
 def get_mrc_size(rec):
     """
     Return the half the size of each dimension for an MRC file, so that we can move the origin to
-        the center instead of the corner of the file
+        the center instead of the corner of the file. The header of each file is only read once.
 
     Args:
         rec: the MRC file to get the size of
@@ -58,36 +109,41 @@ def get_mrc_size(rec):
     Returns: A tuple (x/2, y/2, z/2) of the half-lengths in each dimension
 
     """
-    with warnings.catch_warnings():
-        warnings.simplefilter("ignore")
-        import mrcfile
+    # Only the dimensions at the start of the header and the machine stamp are needed
+    with open(rec, "rb") as f:
+        header = f.read(_MRC_HEADER_PREFIX_SIZE)
+
+    if len(header) < _MRC_HEADER_PREFIX_SIZE:
+        print("ERROR: Could not read the MRC header of: %s" % rec)
+        exit(1)
 
-        with mrcfile.open(rec, mode="r", header_only=True, permissive=True) as mrc:
-            x = mrc.header.nx
-            y = mrc.header.ny
-            z = mrc.header.nz
+    # The machine stamp gives the byte order of the file, which is little-endian unless it says
+    # otherwise
+    if header[212:214] == b"\x11\x11":
+        x, y, z = _MRC_SIZE_STRUCT_BE.unpack_from(header)
+    else:
+        x, y, z = _MRC_SIZE_STRUCT_LE.unpack_from(header)
 
-            return float(x) / 2, float(y) / 2, float(z) / 2
+    return float(x) / 2, float(y) / 2, float(z) / 2
 
 
 def shift_coordinates_bottom_left(coords, size, binning=1):
     """
-    Given an XYZ tuple of particle coordinates and the reconstruction they came from, shift the
-        coordinates so that the origin is at the bottom-left of the tomogram
+    Given XYZ particle coordinates and the reconstruction they came from, shift the coordinates
+        so that the origin is at the bottom-left of the tomogram
 
     Args:
-        coords: the (x, y, z) coordinates for the particle
+        coords: the (x, y, z) coordinates for a particle, or an (N, 3) array of them to shift all
+            at once
         size: the reconstruction MRC half-dimensions in (nx/2, ny/2, nz/2) form
         binning: the bin factor from the original stack to the final reconstruction, to be used if
             you are using coordinates based on the original unbinned coordinate system
 
-    Returns: the new coordinates as a (x, y, z) tuple
+    Returns: the new coordinates as an array of the same shape
 
     """
-    return (
-        float(coords[0]) / binning + size[0],
-        float(coords[1]) / binning + size[1],
-        float(coords[2]) / binning + size[2],
+    return np.asarray(coords, dtype=np.float64) / binning + np.asarray(
+        size, dtype=np.float64
     )
 
 
@@ -98,7 +154,8 @@ def get_slicer_info(mod_file):
     Args:
         mod_file: The .mod file path
 
-    Returns: A list of Slicer point objects with keys {"angles", "coords"}
+    Returns: A tuple of (N, 3) arrays (coords, angles) of the Slicer point coordinates and their
+        (x, y, z) Slicer angles
 
     """
     results = []
@@ -110,35 +167,39 @@ def get_slicer_info(mod_file):
             )
             exit(1)
 
-        # Read past rest of ID and file header
-        file.read(236)
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            # Start scanning for tokens just before the end of the ID and file header
+            pos = 237
+            while True:
+                match = _RE_MOD_TOKENS.search(buf, pos)
+                if match is None or match.group() == b"IEOF":
+                    break
 
-        while token != b"IEOF":
-            file.seek(-3, 1)
-            token = file.read(4)
-            if token == b"SLAN":
-                # Read past SLAN object size and time
-                file.read(8)
+                pos = match.start()
+                if match.group() == b"SLAN":
+                    # Fail on a truncated SLAN chunk rather than reading past the file
+                    if pos + 12 + _SLAN_STRUCT.size > len(buf):
+                        print("Found a truncated SLAN chunk in MOD file: %s" % mod_file)
+                        exit(1)
 
-                angles = struct.unpack(">" + ("f" * 3), file.read(4 * 3))
-                xyz = struct.unpack(">" + ("f" * 3), file.read(4 * 3))
+                    # Skip the SLAN token, object size and time
+                    slan = _SLAN_STRUCT.unpack_from(buf, pos + 12)
 
-                results.append({"angles": list(angles), "coords": xyz})
-                file.read(32)
+                    results.append(slan)
 
-                # Read forward a little so next iteration of while loop starts at end of SLAN object
-                file.read(3)
-            elif token == b"OBJT":
-                # Objects are 176 bytes; skip path to make reading faster
-                file.read(176)
-                # Read forward a little so next iteration of while loop starts at end of object
-                file.read(3)
+                    # Continue scanning at the end of the SLAN object
+                    pos += 68
+                else:
+                    # Objects are 180 bytes including the token; skip past to make reading faster
+                    pos += 180
 
     if len(results) == 0:
         print("Reached end of MOD file without finding slicer angles!")
         exit(1)
 
-    return results
+    # Each SLAN chunk holds the three angles followed by the three coordinates
+    slans = np.array(results)
+    return slans[:, 3:], slans[:, :3]
 
 
 def slicer_angles_to_dynamo_angles(angles):
@@ -152,19 +213,54 @@ def slicer_angles_to_dynamo_angles(angles):
         The corresponding Euler angles for Dynamo
 
     """
+    return list(slicer_angles_to_dynamo_angles_batch([angles])[0])
 
-    # Slicer stores angles in XYZ order even though rotations are applied as ZYX, so we flip here
-    rot = R.from_euler("zyx", [angles[2], angles[1], angles[0]], degrees=True)
-    # 3dmod and Dynamo have different symmetry axis and we need to rotate around the x by 90 to account for that
-    orientation_mat = np.dot(
-        R.from_euler("zxz", [0, 90, 0], degrees=True).as_matrix(), rot.as_matrix()
-    )
 
-    rot = R.from_matrix(orientation_mat)
-    peet = rot.inv().as_euler("zxz", degrees=True)
-    dynamo = [-peet[2], -peet[1], -peet[0]]
+def slicer_angles_to_dynamo_angles_batch(angles):
+    """
+    Given many sets of angles from IMOD's Slicer, convert them all to Dynamo format Euler angles at
+        once
 
-    return dynamo
+    Args:
+        angles: A list or (N, 3) array of (x, y, z) Slicer angles
+
+    Returns:
+        An (N, 3) array of the corresponding Euler angles for Dynamo
+
+    """
+    angles = np.asarray(angles, dtype=np.float64).reshape(-1, 3)
+    if len(angles) == 0:
+        return angles
+
+    # Slicer stores angles in XYZ order even though rotations are applied as ZYX, and 3dmod and
+    # Dynamo have different symmetry axes so we also need to rotate around the x by 90. The ZXZ
+    # Dynamo angles (tdrot, tilt, narot) are read straight off the entries of the combined matrix
+    # Rx(x + 90) * Ry(y) * Rz(z), which skips building and inverting SciPy Rotation objects.
+    x, y, z = np.radians(angles).T
+    sin_x90, cos_x90 = np.cos(x), -np.sin(x)
+    sin_y, cos_y = np.sin(y), np.cos(y)
+    sin_z, cos_z = np.sin(z), np.cos(z)
+    m02 = sin_y
+    m12 = -sin_x90 * cos_y
+    m22 = cos_x90 * cos_y
+    m20 = sin_x90 * sin_z - cos_x90 * sin_y * cos_z
+    m21 = sin_x90 * cos_z + cos_x90 * sin_y * sin_z
+
+    dynamo = np.empty_like(angles)
+    sin_tilt = np.hypot(m02, m12)
+    dynamo[:, 1] = -np.arctan2(sin_tilt, m22)
+    dynamo[:, 2] = np.arctan2(-m02, m12)
+    dynamo[:, 0] = np.arctan2(-m20, -m21)
+
+    # At gimbal lock only the sum of the two z rotations is defined, so put it all in narot
+    lock = sin_tilt < 1e-7
+    if lock.any():
+        m00 = cos_y[lock] * cos_z[lock]
+        m10 = cos_x90[lock] * sin_z[lock] + sin_x90[lock] * sin_y[lock] * cos_z[lock]
+        dynamo[lock, 0] = 0
+        dynamo[lock, 2] = np.arctan2(m10, m00)
+
+    return np.degrees(dynamo)
 
 
 def extract_tilt_range(tlt_file):
@@ -178,16 +274,135 @@ def extract_tilt_range(tlt_file):
 
     """
 
-    angles = np.loadtxt(tlt_file)
+    # Convert the whole file to floats in one NumPy call rather than line by line like np.loadtxt
+    with open(tlt_file, "r") as f:
+        angles = np.array(f.read().split(), dtype=np.float64)
 
     return round(np.min(angles)), round(np.max(angles))
 
 
+def load_slicer_angles(slicer_angles_csv):
+    """
+    Load the Slicer angles the IMOD Processor saved for a tomogram, so that they can all be
+        converted to Dynamo angles in a single slicer_angles_to_dynamo_angles_batch call
+
+    Args:
+        slicer_angles_csv: The tomogram's slicer angles CSV, with one comma-separated row of three
+            angles per particle
+
+    Returns: An (N, 3) array of Slicer angles, in particle order
+
+    """
+    with open(slicer_angles_csv, "r") as f:
+        tokens = f.read().replace(",", " ").split()
+
+    return np.array(tokens, dtype=np.float64).reshape(-1, 3)
+
+
+def write_tbl_rows(
+    table_file, first_particle_num, angles, min_tilt, max_tilt, tomogram_num, coords
+):
+    """
+    Write out the .tbl file rows for all the particles of a tomogram at once
+
+    Args:
+        table_file: The open .tbl file to write to
+        first_particle_num: The particle tag to give the first particle, with the rest numbered
+            consecutively
+        angles: An (N, 3) array of the Dynamo Euler angles of the particles
+        min_tilt: The minimum tilt angle of the tomogram
+        max_tilt: The maximum tilt angle of the tomogram
+        tomogram_num: The tomogram number, or an (N,) array of numbers for each particle
+        coords: An (N, 3) array of the particle coordinates
+
+    Returns: None
+
+    """
+    angles = np.asarray(angles, dtype=np.float64).reshape(-1, 3)
+    num_particles = len(angles)
+    if num_particles == 0:
+        return
+
+    rows = np.empty((num_particles, 10), dtype=np.float64)
+    rows[:, 0] = np.arange(first_particle_num, first_particle_num + num_particles)
+    rows[:, 1:4] = angles
+    rows[:, 4] = int(min_tilt)
+    rows[:, 5] = int(max_tilt)
+    rows[:, 6] = tomogram_num
+    rows[:, 7:10] = np.asarray(coords, dtype=np.float64).reshape(-1, 3)
+
+    np.savetxt(table_file, rows, fmt=_TBL_ROW_FORMAT)
+
+
 ############################
 #   IMOD Main Functions    #
 ############################
 
 
+def _imod_real_to_dynamo_tomogram(subdir_path, dynamo_args):
+    """
+    Collect the Dynamo .doc and .tbl file information for a single tomogram directory of a real
+        data IMOD project
+
+    Args:
+        subdir_path: The tomogram's IMOD directory
+        dynamo_args: The Dynamo Processor arguments
+
+    Returns: (the reconstruction path, the (N, 3) Dynamo Euler angles, the minimum tilt angle, the
+        maximum tilt angle, the (N, 3) particle coordinates)
+
+    """
+    subdir = os.path.basename(subdir_path)
+
+    # Look for the necessary IMOD files
+    mod = ""
+    tlt = ""
+    rec = ""
+    with os.scandir(subdir_path) as files:
+        for f in files:
+            file = f.name
+            if dynamo_args["mod_contains"] in file and file.endswith(".mod"):
+                mod = file
+            elif dynamo_args["tlt_contains"] in file and file.endswith(".tlt"):
+                tlt = file
+            elif dynamo_args["rec_contains"] in file and file.endswith(
+                (".mrc", ".rec")
+            ):
+                rec = file
+
+            # Break out of loop once all three relevant files have been found
+            if mod != "" and tlt != "" and rec != "":
+                break
+
+    if rec == "":
+        print("ERROR: No reconstruction was found for sub-directory: %s" % subdir)
+        exit(1)
+
+    if tlt != "":
+        min_tilt, max_tilt = extract_tilt_range(os.path.join(subdir_path, tlt))
+    else:
+        print("WARNING: No tlt file was found for sub-directory: %s" % subdir)
+        exit(1)
+
+    if mod == "":
+        print("Error: No mod file was found for sub-directory: %s" % subdir)
+        exit(1)
+
+    # Read the .mod file info
+    coords, angles = get_slicer_info(os.path.join(subdir_path, mod))
+
+    # Convert the Slicer angles to Dynamo Euler angles all at once
+    dynamo_angles = slicer_angles_to_dynamo_angles_batch(angles)
+
+    return (
+        "{:s}/{:s}".format(subdir_path, rec),
+        dynamo_angles,
+        min_tilt,
+        max_tilt,
+        coords,
+    )
+
+
 def imod_real_to_dynamo(dynamo_args):
     """
     Starting from real data processed with the IMOD Processor, generate the Dynamo .doc and
@@ -217,88 +432,156 @@ def imod_real_to_dynamo(dynamo_args):
     # Retrieve parameters to write to files
     # -------------------------------------
     global_particle_num = 1
-    tomogram_num = 1
     root = dynamo_args["imod_dir"]
-    for subdir in os.listdir(root):
-        if subdir.startswith(dynamo_args["dir_contains"]):
+    # os.scandir order depends on the filesystem, so sort the directories to number the tomograms
+    # and particles the same way on every run
+    with os.scandir(root) as it:
+        subdir_paths = sorted(
+            entry.path
+            for entry in it
+            if entry.name.startswith(dynamo_args["dir_contains"]) and entry.is_dir()
+        )
+    total_num = len(subdir_paths)
+
+    # Each tomogram directory is independent, so collect their information in parallel.
+    # executor.map yields the results in the order of subdir_paths, so the files are still
+    # written out in sorted directory order
+    process_tomogram = functools.partial(
+        _imod_real_to_dynamo_tomogram, dynamo_args=dynamo_args
+    )
+    with ProcessPoolExecutor() as executor:
+        for num, result in enumerate(executor.map(process_tomogram, subdir_paths)):
+            rec_path, dynamo_angles, min_tilt, max_tilt, coords = result
             print("")
-            print("Collecting information for directory: %s" % subdir)
-
-            # Look for the necessary IMOD files
-            mod = ""
-            tlt = ""
-            rec = ""
-            min_tilt = 0
-            max_tilt = 0
-            for file in os.listdir(os.path.join(root, subdir)):
-                if dynamo_args["mod_contains"] in file and file.endswith(".mod"):
-                    mod = file
-                elif dynamo_args["tlt_contains"] in file and file.endswith(".tlt"):
-                    tlt = file
-                elif dynamo_args["rec_contains"] in file and (
-                    file.endswith(".mrc") or file.endswith(".rec")
-                ):
-                    rec = file
-
-                # Break out of loop once all three relevant files have been found
-                if mod != "" and tlt != "" and rec != "":
-                    break
+            print("Writing .doc and .tbl file entries for: %s" % rec_path)
+            print("This is directory %d out of %d" % (num + 1, total_num))
 
-            if rec == "":
-                print(
-                    "ERROR: No reconstruction was found for sub-directory: %s" % subdir
-                )
-                exit(1)
+            tomograms_doc_file.write("{:d} {:s}\n".format(num + 1, rec_path))
+            write_tbl_rows(
+                table_file,
+                global_particle_num,
+                dynamo_angles,
+                min_tilt,
+                max_tilt,
+                num + 1,
+                coords,
+            )
+            global_particle_num += len(coords)
+
+    table_file.close()
+    tomograms_doc_file.close()
+
+    return tomograms_doc_path, table_path, "input"
 
-            # Copy over the tlt file to the maps folder
-            if tlt != "":
-                min_tilt, max_tilt = extract_tilt_range(os.path.join(root, subdir, tlt))
-            else:
-                print("WARNING: No tlt file was found for sub-directory: %s" % subdir)
-                exit(1)
 
-            if mod == "":
-                print("Error: No mod file was found for sub-directory: %s" % subdir)
-                exit(1)
+def _imod_reconstruction_name(basename, processor_info):
+    """
+    Get the file name of the reconstruction the IMOD Processor made for a tomogram
 
-            # Read the .mod file info
-            print("Reading the .mod file for Slicer info...")
-            slicer_info = get_slicer_info(os.path.join(root, subdir, mod))
+    Args:
+        basename: The basename of the tomogram's IMOD directory
+        processor_info: The IMOD Processor arguments
 
-            tomograms_doc_file.write(
-                "{:d} {:s}/{:s}\n".format(tomogram_num, os.path.join(root, subdir), rec)
+    Returns: The reconstruction file name
+
+    """
+    if processor_info["reconstruction_method"].startswith("imod"):
+        if (
+            "binvol" in processor_info
+            and processor_info["binvol"]
+            and processor_info["binvol"]["binning"] != 1
+        ):
+            rec = "%s_full_bin%d.mrc" % (
+                basename,
+                processor_info["binvol"]["binning"],
+            )
+        else:
+            if (
+                "filename_convention" in processor_info
+                and processor_info["filename_convention"] == "new"
+            ):
+                rec = "%s_full_rec.mrc" % basename
+            else:
+                rec = "%s_full.rec" % basename
+    else:
+        if (
+            "binvol" in processor_info
+            and processor_info["binvol"]
+            and processor_info["binvol"]["binning"] != 1
+        ):
+            rec = "%s_SIRT_bin%d.mrc" % (
+                basename,
+                processor_info["binvol"]["binning"],
             )
+        else:
+            rec = "%s_SIRT.mrc" % basename
 
-            print("Converting particle angles and writing .tbl file entry...")
-            for particle in slicer_info:
-                # Convert the Slicer angles to Dynamo Euler angles
-                particle["angles"] = slicer_angles_to_dynamo_angles(particle["angles"])
+    return rec
 
-                row = "{0:d} 1 1 0 0 0 {1:.3f} {2:.3f} {3:.3f} 0 0 0 1 {4:d} {5:d} 0 0 0 0 {6:d} 0 0 0 {7:.3f} {8:.3f} {9:.3f} 0 0 0 0 0 0\n".format(
-                    global_particle_num,
-                    particle["angles"][0],
-                    particle["angles"][1],
-                    particle["angles"][2],
-                    int(min_tilt),
-                    int(max_tilt),
-                    tomogram_num,
-                    particle["coords"][0],
-                    particle["coords"][1],
-                    particle["coords"][2],
-                )
 
-                table_file.write(row)
-                global_particle_num += 1
+def _imod_processor_to_dynamo_tomogram(
+    tomogram, root, name, processor_info, binning, size
+):
+    """
+    Collect the Dynamo .doc and .tbl file information for a single tomogram of an IMOD Processor
+        project
+
+    Args:
+        tomogram: The tomogram's entry in the simulation metadata
+        root: The ETSimulations project root
+        name: The name used for naming the stacks
+        processor_info: The IMOD Processor arguments
+        binning: The binning applied to the reconstruction
+        size: The reconstruction size, or None to read it from the reconstruction
 
-            tomogram_num += 1
+    Returns: (the reconstruction path, the (N, 3) Dynamo Euler angles, the minimum tilt angle, the
+        maximum tilt angle, the (N, 3) particle coordinates)
 
-        table_file.close()
-        tomograms_doc_file.close()
+    """
+    basename = "%s_%d" % (name, tomogram["global_stack_no"])
+    tomogram_dir = os.path.join(root, "processed_data/IMOD", basename)
+
+    # Positions for TEM-Simulator are in nm, need to convert to pixels
+    positions = np.array(tomogram["positions"]) / tomogram["apix"]
+    # During reconstruction, there is a 90 degree rotation around the z-axis, so correct for
+    # that with the positions
+    positions = rotate_positions_around_z(positions)
+
+    slicer_angles_csv = os.path.join(tomogram_dir, "%s_slicerAngles.csv" % name)
+    orientations = load_slicer_angles(slicer_angles_csv)
+
+    # Look for the necessary IMOD files
+    rec = _imod_reconstruction_name(basename, processor_info)
+    if not os.path.exists(os.path.join(tomogram_dir, rec)):
+        print("ERROR: No reconstruction was found for sub-directory: %s" % tomogram_dir)
+        exit(1)
 
-    return tomograms_doc_path, table_path, "input"
+    tlt = "%s.tlt" % basename
+    # Parse tilt params
+    if os.path.exists(os.path.join(tomogram_dir, tlt)):
+        min_tilt, max_tilt = extract_tilt_range(os.path.join(tomogram_dir, tlt))
+    else:
+        print("WARNING: No tlt file was found for sub-directory: %s" % tomogram_dir)
+        exit(1)
+
+    if size is None:
+        size = get_mrc_size(os.path.join(tomogram_dir, rec))
+
+    # Convert the Slicer angles to Dynamo Euler angles all at once
+    dynamo_angles = slicer_angles_to_dynamo_angles_batch(orientations)
+    # Shift all the coordinates to have the origin at the tomogram bottom-left
+    coords = shift_coordinates_bottom_left(positions, size, binning)
+
+    return (
+        "{:s}/{:s}".format(tomogram_dir, rec),
+        dynamo_angles,
+        min_tilt,
+        max_tilt,
+        coords,
+    )
 
 
-def imod_processor_to_dynamo(root, name):
+def imod_processor_to_dynamo(root, name, dynamo_args):
     """
     Starting from simulated data processed with the IMOD Processor, generate the Dynamo .doc and
         .tbl files necessary for particle extraction and STA project setup
@@ -306,6 +589,7 @@ def imod_processor_to_dynamo(root, name):
     Args:
         root: The ETSimulations project root
         name: The name used for naming the stacks
+        dynamo_args: The Dynamo Processor arguments
 
     Returns: (the .doc file path, the .tbl file path, the table basename)
 
@@ -320,10 +604,7 @@ def imod_processor_to_dynamo(root, name):
         os.mkdir(dynamo_root)
 
     tomograms_doc_path = dynamo_root + "/tomograms_input.doc"
-    tomograms_doc_file = open(tomograms_doc_path, "w")
-
     table_path = dynamo_root + "/input.tbl"
-    table_file = open(table_path, "w")
 
     # Iterate through the tomograms in the order they appear in the metadata file instead of just
     # iterating through the processed IMOD directory like with the real data version of this
@@ -334,129 +615,75 @@ def imod_processor_to_dynamo(root, name):
 
     # Load IMOD Processor info
     processor_info_file = os.path.join(root, "processed_data/imod_info.json")
-    processor_info = json.load(open(processor_info_file, "r"))["args"]
+    with open(processor_info_file, "rb") as f:
+        processor_info = _load_json(f)["args"]
 
-    with open(metadata_file, "r") as f:
-        metadata = json.loads(f.read())
-
-        # -------------------------------------
-        # Retrieve parameters to write to files
-        # -------------------------------------
-        total_num = len(metadata)
-        global_particle_num = 1
-        for num, tomogram in enumerate(metadata):
-            basename = "%s_%d" % (name, tomogram["global_stack_no"])
-            tomogram_dir = os.path.join(root, "processed_data/IMOD", basename)
-            print("")
-            print("Collecting information for directory: %s" % tomogram_dir)
-            print("This is directory %d out of %d" % (num + 1, total_num))
-
-            # Positions for TEM-Simulator are in nm, need to convert to pixels
-            positions = np.array(tomogram["positions"]) / tomogram["apix"]
-            # During reconstruction, there is a 90 degree rotation around the z-axis, so correct for
-            # that with the positions
-            positions = rotate_positions_around_z(positions)
-
-            slicer_angles_csv = os.path.join(tomogram_dir, "%s_slicerAngles.csv" % name)
-            print("Loading Slicer angles...")
-            orientations = np.loadtxt(slicer_angles_csv, delimiter=",")
-
-            # Compile Slicer infos
-            slicer_info = []
-            for i, coords in enumerate(positions):
-                angles = orientations[i]
-                slicer_info.append({"coords": coords, "angles": angles})
-
-            # Look for the necessary IMOD files
-            print("Looking for necessary IMOD files...")
-            if processor_info["reconstruction_method"].startswith("imod"):
-                if (
-                    "binvol" in processor_info
-                    and processor_info["binvol"]
-                    and processor_info["binvol"]["binning"] != 1
-                ):
-                    rec = "%s_full_bin%d.mrc" % (
-                        basename,
-                        processor_info["binvol"]["binning"],
-                    )
-                else:
-                    if (
-                        "filename_convention" in processor_info
-                        and processor_info["filename_convention"] == "new"
-                    ):
-                        rec = "%s_full_rec.mrc" % basename
-                    else:
-                        rec = "%s_full.rec" % basename
-            else:
-                if (
-                    "binvol" in processor_info
-                    and processor_info["binvol"]
-                    and processor_info["binvol"]["binning"] != 1
-                ):
-                    rec = "%s_SIRT_bin%d.mrc" % (
-                        basename,
-                        processor_info["binvol"]["binning"],
-                    )
-                else:
-                    rec = "%s_SIRT.mrc" % basename
-
-            if not os.path.exists(os.path.join(tomogram_dir, rec)):
-                print(
-                    "ERROR: No reconstruction was found for sub-directory: %s"
-                    % tomogram_dir
-                )
-                exit(1)
-
-            tlt = "%s.tlt" % basename
-            # Parse tilt params
-            if os.path.exists(os.path.join(tomogram_dir, tlt)):
-                min_tilt, max_tilt = extract_tilt_range(os.path.join(tomogram_dir, tlt))
-            else:
-                print(
-                    "WARNING: No tlt file was found for sub-directory: %s"
-                    % tomogram_dir
-                )
+    # Only keep the fields the workers need, so the rest of the metadata is freed here instead of
+    # being pickled to the workers
+    with open(metadata_file, "rb") as f:
+        tomograms = [
+            {key: tomogram[key] for key in ("global_stack_no", "apix", "positions")}
+            for tomogram in _load_json(f)
+        ]
 
-            tomograms_doc_file.write(
-                "{:d} {:s}/{:s}\n".format(num + 1, tomogram_dir, rec)
-            )
+    # -------------------------------------
+    # Retrieve parameters to write to files
+    # -------------------------------------
+    total_num = len(tomograms)
+    global_particle_num = 1
 
-            print(
-                "Converting particle positions and angles and writing .tbl file entry..."
-            )
-            rec_fullpath = os.path.join(root, tomogram_dir, rec)
+    if "binvol" in processor_info:
+        binning = processor_info["binvol"]["binning"]
+    else:
+        binning = 1
+
+    # If all the reconstructions are the same size, only read the size of the first one
+    size = None
+    if dynamo_args.get("uniform_tomogram_size", False) and total_num > 0:
+        basename = "%s_%d" % (name, tomograms[0]["global_stack_no"])
+        rec_fullpath = os.path.join(
+            root,
+            "processed_data/IMOD",
+            basename,
+            _imod_reconstruction_name(basename, processor_info),
+        )
+        # A missing reconstruction is reported by the worker for the first tomogram
+        if os.path.exists(rec_fullpath):
             size = get_mrc_size(rec_fullpath)
-            if "binvol" in processor_info:
-                binning = processor_info["binvol"]["binning"]
-            else:
-                binning = 1
 
-            for particle in slicer_info:
-                # Shift the coordinates to have the origin at the tomogram bottom-left
-                particle["coords"] = shift_coordinates_bottom_left(
-                    particle["coords"], size, binning
-                )
-                # Convert the Slicer angles to Dynamo Euler angles
-                particle["angles"] = slicer_angles_to_dynamo_angles(particle["angles"])
-
-                row = "{0:d} 1 1 0 0 0 {1:.3f} {2:.3f} {3:.3f} 0 0 0 1 {4:d} {5:d} 0 0 0 0 {6:d} 0 0 0 {7:.3f} {8:.3f} {9:.3f} 0 0 0 0 0 0\n".format(
-                    global_particle_num,
-                    particle["angles"][0],
-                    particle["angles"][1],
-                    particle["angles"][2],
-                    int(min_tilt),
-                    int(max_tilt),
-                    num + 1,
-                    particle["coords"][0],
-                    particle["coords"][1],
-                    particle["coords"][2],
-                )
+    # Each tomogram is independent, so collect their information in parallel and write the files
+    # out in metadata order here so that the particle and tomogram numbering is deterministic
+    process_tomogram = functools.partial(
+        _imod_processor_to_dynamo_tomogram,
+        root=root,
+        name=name,
+        processor_info=processor_info,
+        binning=binning,
+        size=size,
+    )
+    tomograms_doc_file = open(tomograms_doc_path, "w")
+    table_file = open(table_path, "w")
+    with ProcessPoolExecutor() as executor:
+        for num, result in enumerate(executor.map(process_tomogram, tomograms)):
+            rec_path, dynamo_angles, min_tilt, max_tilt, coords = result
+            print("")
+            print("Writing .doc and .tbl file entries for: %s" % rec_path)
+            print("This is directory %d out of %d" % (num + 1, total_num))
 
-                table_file.write(row)
-                global_particle_num += 1
+            tomograms_doc_file.write("{:d} {:s}\n".format(num + 1, rec_path))
+            write_tbl_rows(
+                table_file,
+                global_particle_num,
+                dynamo_angles,
+                min_tilt,
+                max_tilt,
+                num + 1,
+                coords,
+            )
+            global_particle_num += len(coords)
 
-        table_file.close()
-        tomograms_doc_file.close()
+    table_file.close()
+    tomograms_doc_file.close()
 
     return tomograms_doc_path, table_path, "input"
 
@@ -665,8 +892,8 @@ def eman2_processor_to_dynamo(root, name, dynamo_args):
 
     eman2_dir = os.path.join(processed_data_dir, "EMAN2")
 
-    with open(metadata_file, "r") as f:
-        metadata = json.loads(f.read())
+    with open(metadata_file, "rb") as f:
+        metadata = _load_json(f)
 
         # -------------------------------------
         # Retrieve parameters to write to files
@@ -718,39 +945,35 @@ def eman2_processor_to_dynamo(root, name, dynamo_args):
                 num_particles_in_tomogram = len(orientations)
                 num_digits = math.floor(math.log10(num_particles_in_tomogram)) + 1
                 print("")
-                for i in range(num_particles_in_tomogram):
-                    print(
-                        "Updating Dynamo files for particle %d of %d for the tomogram..."
-                        % (i + 1, num_particles_in_tomogram)
-                    )
-                    particle_num = i + 1
-                    particle_map = "{:s}-{:0{:d}d}".format(
-                        basename, particle_num, num_digits
-                    )
+                print(
+                    "Updating Dynamo files for the %d particles of the tomogram..."
+                    % num_particles_in_tomogram
+                )
+                particle_nums = np.arange(
+                    global_particle_num, global_particle_num + num_particles_in_tomogram
+                )
 
-                    tomograms_doc_file.write(
-                        "{:d} tomograms/{:s}.mrc\n".format(
-                            global_particle_num, particle_map
+                # Each particle map is treated as its own tomogram
+                tomograms_doc_file.write(
+                    "".join(
+                        "{:d} tomograms/{:s}-{:0{:d}d}.mrc\n".format(
+                            global_particle_num + i, basename, i + 1, num_digits
                         )
+                        for i in range(num_particles_in_tomogram)
                     )
+                )
 
-                    center = box_size / 2
-
-                    row = "{0:d} 1 1 0 0 0 {1:.3f} {2:.3f} {3:.3f} 0 0 0 1 {4:d} {5:d} 0 0 0 0 {6:d} 0 0 0 {7:.3f} {8:.3f} {9:.3f} 0 0 0 0 0 0\n".format(
-                        global_particle_num,
-                        orientations[i][0],
-                        orientations[i][1],
-                        orientations[i][2],
-                        int(min_tilt),
-                        int(max_tilt),
-                        global_particle_num,
-                        center,
-                        center,
-                        center,
-                    )
-
-                    table_file.write(row)
-                    global_particle_num += 1
+                center = box_size / 2
+                write_tbl_rows(
+                    table_file,
+                    global_particle_num,
+                    orientations,
+                    min_tilt,
+                    max_tilt,
+                    particle_nums,
+                    np.full((num_particles_in_tomogram, 3), center),
+                )
+                global_particle_num += num_particles_in_tomogram
 
         table_file.close()
         tomograms_doc_file.close()
@@ -789,10 +1012,7 @@ def eman2_real_to_dynamo(dynamo_args):
         os.mkdir(tomograms_path)
 
     tomograms_doc_path = dynamo_root + "/tomograms_input.doc"
-    tomograms_doc_file = open(tomograms_doc_path, "w")
-
     table_path = dynamo_root + "/input.tbl"
-    table_file = open(table_path, "w")
 
     # Extract individual particle maps from the stacks
     print("\nExtracting individual particle maps...")
@@ -803,6 +1023,8 @@ def eman2_real_to_dynamo(dynamo_args):
     # Extract individual particle maps into maps folder
     num_particles = len(particles)
     progress = 1
+    doc_lines = []
+    table_rows = []
     for particle_no, transformation_matrix in particles.items():
         print("Working on particle {:d} out of {:d}...".format(progress, num_particles))
         lst_entry = lst_entries[particle_no]
@@ -818,7 +1040,7 @@ def eman2_real_to_dynamo(dynamo_args):
         info_file = os.path.join(eman2_dir, lst_entry["info"])
         min_tilt, max_tilt, box_size = get_eman2_info(info_file, boxer_class_name)
 
-        tomograms_doc_file.write(
+        doc_lines.append(
             "{:d} tomograms/{:s}.mrc\n".format(particle_no + 1, particle_map)
         )
 
@@ -826,7 +1048,7 @@ def eman2_real_to_dynamo(dynamo_args):
 
         orientation = transformation_matrix_to_euler(transformation_matrix)
 
-        row = "{0:d} 1 1 0 0 0 {1:.3f} {2:.3f} {3:.3f} 0 0 0 1 {4:d} {5:d} 0 0 0 0 {6:d} 0 0 0 {7:.3f} {8:.3f} {9:.3f} 0 0 0 0 0 0\n".format(
+        row = _TBL_ROW_FORMAT % (
             particle_no + 1,
             orientation[0],
             orientation[1],
@@ -838,17 +1060,72 @@ def eman2_real_to_dynamo(dynamo_args):
             center,
             center,
         )
-
-        table_file.write(row)
+        table_rows.append(row + "\n")
 
         progress += 1
 
-    table_file.close()
-    tomograms_doc_file.close()
+    # Write out each file in one go now that all the particles have been collected
+    with open(tomograms_doc_path, "w") as tomograms_doc_file:
+        tomograms_doc_file.writelines(doc_lines)
+
+    with open(table_path, "w") as table_file:
+        table_file.writelines(table_rows)
 
     return tomograms_doc_path, table_path, "input"
 
 
+def _rewrite_template(template, values, dynamo_args):
+    """
+    Rewrite the input parameters section of the Dynamo Matlab template script
+
+    Text before the "%% Input parameters" header and after the "%% Process table" header is passed
+    through unchanged, while the header lines themselves are dropped. Assignments within the section
+    are filled in from values, falling back on the processor arguments.
+
+    Args:
+        template: The full text of the template script
+        values: A dictionary of already formatted values for variables not taken from dynamo_args
+        dynamo_args: The Dynamo Processor arguments
+
+    Returns: The text of the new script
+
+    """
+    start = _RE_INPUT_PARAMS.search(template)
+    if start is None:
+        return template
+
+    end = _RE_PROCESS_TABLE.search(template, start.end())
+    if end is None:
+        section_end = post_start = len(template)
+    else:
+        section_end, post_start = end.span()
+
+    def fill_in_assignment(match):
+        variable_name = match.group(0).strip().partition("=")[0].strip()
+
+        if variable_name in values:
+            value_to_write_out = values[variable_name]
+        elif variable_name == "mwa":
+            print("Missing Dynamo processing parameter: num_workers!")
+            exit(1)
+        elif variable_name in dynamo_args:
+            value = dynamo_args[variable_name]
+            if isinstance(value, str):
+                value_to_write_out = f"'{value}';"
+            else:
+                value_to_write_out = str(value) + ";"
+        else:
+            print("Missing Dynamo processing parameter: %s!" % variable_name)
+            exit(1)
+
+        return " ".join([variable_name, "=", value_to_write_out, "\n"])
+
+    # Replace every assignment line in the section in one pass, leaving comments as they are
+    section = _RE_ASSIGN.sub(fill_in_assignment, template[start.end() : section_end])
+
+    return template[: start.start()] + section + template[post_start:]
+
+
 def dynamo_main(root, name, dynamo_args):
     """
     The main method to drive Dynamo project set up.
@@ -876,7 +1153,7 @@ def dynamo_main(root, name, dynamo_args):
             doc, tbl, basename = imod_real_to_dynamo(dynamo_args)
         else:
             dynamo_root = processed_data_dir + "/Dynamo-from-IMOD"
-            doc, tbl, basename = imod_processor_to_dynamo(root, name)
+            doc, tbl, basename = imod_processor_to_dynamo(root, name, dynamo_args)
     elif dynamo_args["source_type"] == "eman2":
         if dynamo_args["real_data_mode"]:
             dynamo_root = dynamo_args["dynamo_dir"]
@@ -897,80 +1174,20 @@ def dynamo_main(root, name, dynamo_args):
     print("")
     print("Creating processing script at: %s" % new_script)
 
+    # Values for the input parameters which are not taken directly from the processor arguments
+    values = {
+        "basename": f"'{basename}';",
+        "doc_file": f"'{doc}';",
+        "tbl_file": f"'{tbl}';",
+        "particles_dir": "'particles';",
+        "invert_particles": "1;" if dynamo_args["source_type"] == "eman2" else "0;",
+    }
+    if "num_workers" in dynamo_args:
+        values["mwa"] = str(dynamo_args["num_workers"]) + ";"
+
+    with open(template_path, "r") as base_file:
+        template_text = base_file.read()
+
+    script = _rewrite_template(template_text, values, dynamo_args)
     with open(new_script, "w") as new_file:
-        with open(template_path, "r") as base_file:
-            # First look for the input params section
-            while True:
-                line = base_file.readline()
-                # Break if end of file reached early
-                if len(line) == 0:
-                    break
-
-                if re.match(r"^%% Input parameters", line):
-                    break
-                else:
-                    new_file.write(line)
-
-            # Now start replacing input params
-            while True:
-                line = base_file.readline()
-
-                # Break if end of file reached early
-                if len(line) == 0:
-                    break
-
-                # Break once we reach the end of the segment
-                if re.match(r"^%% Process table", line):
-                    break
-
-                # If we are at an assignment line
-                elif re.match(r".+=", line):
-                    line = line.strip()
-                    tokens = line.split("=")
-                    variable_name = tokens[0].strip()
-
-                    value_to_write_out = ""
-                    if variable_name == "basename":
-                        value_to_write_out = f"'{basename}';"
-                    elif variable_name == "doc_file":
-                        value_to_write_out = f"'{doc}';"
-                    elif variable_name == "tbl_file":
-                        value_to_write_out = f"'{tbl}';"
-                    elif variable_name == "particles_dir":
-                        value_to_write_out = "'particles';"
-                    elif variable_name == "invert_particles":
-                        if dynamo_args["source_type"] == "eman2":
-                            value_to_write_out = "1;"
-                        else:
-                            value_to_write_out = "0;"
-                    elif variable_name == "mwa":
-                        if "num_workers" not in dynamo_args:
-                            print("Missing Dynamo processing parameter: num_workers!")
-                            exit(1)
-                        value_to_write_out = str(dynamo_args["num_workers"]) + ";"
-                    elif variable_name in dynamo_args:
-                        if type(dynamo_args[variable_name]) == str:
-                            value_to_write_out = f"'{dynamo_args[variable_name]}';"
-                        else:
-                            value_to_write_out = str(dynamo_args[variable_name]) + ";"
-                    else:
-                        print(
-                            "Missing Dynamo processing parameter: %s!" % variable_name
-                        )
-                        exit(1)
-
-                    new_line = " ".join([variable_name, "=", value_to_write_out, "\n"])
-
-                    new_file.write(new_line)
-
-                # Other lines in the segment - probably just comments
-                else:
-                    new_file.write(line)
-
-            # For the rest of the code, just write it out
-            while True:
-                line = base_file.readline()
-                if len(line) == 0:
-                    break
-                else:
-                    new_file.write(line)
+        new_file.write(script)
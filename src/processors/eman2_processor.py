@@ -63,57 +63,54 @@ def eman2_main(root, name, eman2_args):
     print("")
     print("Creating processing script at: %s" % new_script)
 
+    with open(template_path, "r") as base_file:
+        lines = base_file.read().splitlines(keepends=True)
+
+    out_lines = []
+    i = 0
+    # First look for the input params section
+    while i < len(lines) and not re.match(r"^# =+ Input parameters", lines[i]):
+        out_lines.append(lines[i])
+        i += 1
+    i += 1
+
+    # Now start replacing input params, until we reach the end of the segment
+    while i < len(lines) and not re.match(r"^# =+", lines[i]):
+        line = lines[i]
+        i += 1
+
+        # If we are at an assignment line
+        if re.match(r".+ =", line):
+            line = line.strip()
+            tokens = line.split(" ")
+            variable_name = tokens[0]
+
+            value_to_write_out = ""
+            if variable_name == "raw_data_dir":
+                value_to_write_out = "\"%s\"" % (root + "/raw_data")
+            elif variable_name == "eman2_root":
+                value_to_write_out = "\"%s\"" % e2_dir
+            elif variable_name == "name":
+                value_to_write_out = "\"%s\"" % name
+            elif variable_name in eman2_args:
+                value_to_write_out = json.dumps(eman2_args[variable_name], indent=2)
+            else:
+                print("Missing EMAN2 processing parameter: %s!" % variable_name)
+                exit(1)
+
+            new_line = " ".join([variable_name, "=", value_to_write_out, "\n"])
+
+            out_lines.append(new_line)
+
+        # Other lines - probably just comments
+        else:
+            out_lines.append(line)
+
+    # For the rest of the code, just write it out
+    out_lines.extend(lines[i + 1:])
+
     with open(new_script, "w") as new_file:
-        with open(template_path, "r") as base_file:
-            # First look for the input params section
-            while True:
-                line = base_file.readline()
-                if re.match(r"^# =+ Input parameters", line):
-                    break
-                else:
-                    new_file.write(line)
-
-            # Now start replacing input params
-            while True:
-                line = base_file.readline()
-                # Break once we reach the end of the segment
-                if re.match(r"^# =+", line):
-                    break
-
-                # If we are at an assignment line
-                elif re.match(r".+ =", line):
-                    line = line.strip()
-                    tokens = line.split(" ")
-                    variable_name = tokens[0]
-
-                    value_to_write_out = ""
-                    if variable_name == "raw_data_dir":
-                        value_to_write_out = "\"%s\"" % (root + "/raw_data")
-                    elif variable_name == "eman2_root":
-                        value_to_write_out = "\"%s\"" % e2_dir
-                    elif variable_name == "name":
-                        value_to_write_out = "\"%s\"" % name
-                    elif variable_name in eman2_args:
-                        value_to_write_out = json.dumps(eman2_args[variable_name], indent=2)
-                    else:
-                        print("Missing EMAN2 processing parameter: %s!" % variable_name)
-                        exit(1)
-
-                    new_line = " ".join([variable_name, "=", value_to_write_out, "\n"])
-
-                    new_file.write(new_line)
-
-                # Other lines - probably just comments
-                else:
-                    new_file.write(line)
-
-            # For the rest of the code, just write it out
-            while True:
-                line = base_file.readline()
-                if len(line) == 0:
-                    break
-                else:
-                    new_file.write(line)
+        new_file.writelines(out_lines)
 
     # Also output the commands as a simple text file for easier viewing and modification if desired
     spec = importlib.util.spec_from_file_location("eman2_process", new_script)
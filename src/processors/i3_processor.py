@@ -12,6 +12,14 @@ import subprocess, shlex
 import json
 import math
 import warnings
+import re
+import mmap
+
+# Matches the IMOD .mod file chunk IDs which get_slicer_info needs to act on
+_RE_MOD_TOKENS = re.compile(b"SLAN|OBJT|IEOF")
+
+# The Slicer angles and XYZ center stored in a SLAN chunk, as big-endian floats
+_SLAN_STRUCT = struct.Struct(">6f")
 
 
 #################################
@@ -42,16 +50,19 @@ def rotate_positions_around_z(positions):
         coordinate system for simulated data.
 
     Args:
-        positions: A list of [x, y, z] coordinates
+        positions: A list or (N, 3) array of [x, y, z] coordinates
 
-    Returns: None
+    Returns: The rotated coordinates as an (N, 3) array
 
     """
-    rot = R.from_euler("zxz", (90, 0, 0), degrees=True)
-    for i, point in enumerate(positions):
-        positions[i] = np.dot(rot.as_matrix(), np.array(point))
+    positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
 
-    return positions
+    # A 90 degree rotation around z is exactly (x, y, z) -> (-y, x, z)
+    rotated = np.empty_like(positions)
+    rotated[:, 0] = -positions[:, 1]
+    rotated[:, 1] = positions[:, 0]
+    rotated[:, 2] = positions[:, 2]
+    return rotated
 
 
 def shift_coordinates_bottom_left(coords, size, binning=1):
@@ -117,6 +128,52 @@ def split_coords(coords):
     return icoord, diff_coord
 
 
+def _copy_file(src, dst, link=False):
+    """
+    Copy a reconstruction into the I3 maps folder, hard linking it instead if asked to and falling
+        back on os.copy_file_range and then shutil.copyfile.
+
+    Args:
+        src: The reconstruction to copy
+        dst: The destination path in the maps folder
+        link: If True, hard link the destination to the source when the two are on the same
+            filesystem. Only use this if neither the original nor the I3 copy will be modified in
+            place.
+
+    Returns: None
+
+    """
+    # A map linked on a previous run is the source itself, and opening it for writing below would
+    # truncate the original reconstruction
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return
+
+    if link:
+        try:
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+
+    try:
+        with open(src, "rb") as src_file, open(dst, "wb") as dst_file:
+            remaining = os.fstat(src_file.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(
+                    src_file.fileno(), dst_file.fileno(), remaining
+                )
+                if copied == 0:
+                    break
+                remaining -= copied
+        if remaining == 0:
+            return
+    except (AttributeError, OSError):
+        pass
+
+    # Fall back on a regular copy if the kernel could not copy the file for us
+    shutil.copyfile(src, dst)
+
+
 ######################################
 #   IMOD-related Helper Functions    #
 ######################################
@@ -191,7 +248,10 @@ def convert_tlt_imod(map_file, tilt_angle, file_in, file_out):
         "    PHI    0.000\n",
     ]
 
-    angles = np.loadtxt(file_in)
+    # Convert the whole file to floats in one NumPy call rather than line by line like np.loadtxt
+    with open(file_in, "r") as f:
+        angles = np.array(f.read().split(), dtype=np.float64)
+
     for i, angle in enumerate(angles):
         line = "  IMAGE %03d" % (i + 1)
         line += "       ORIGIN [  0.000   0.000 ]"
@@ -247,29 +307,31 @@ def get_slicer_info(mod_file):
             )
             exit(1)
 
-        # Read past rest of ID and file header
-        file.read(236)
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            # Start scanning for tokens just before the end of the ID and file header
+            pos = 237
+            while True:
+                match = _RE_MOD_TOKENS.search(buf, pos)
+                if match is None or match.group() == b"IEOF":
+                    break
 
-        while token != b"IEOF":
-            file.seek(-3, 1)
-            token = file.read(4)
-            if token == b"SLAN":
-                # Read past SLAN object size and time
-                file.read(8)
+                pos = match.start()
+                if match.group() == b"SLAN":
+                    # Fail on a truncated SLAN chunk rather than reading past the file
+                    if pos + 12 + _SLAN_STRUCT.size > len(buf):
+                        print("Found a truncated SLAN chunk in MOD file: %s" % mod_file)
+                        exit(1)
 
-                angles = struct.unpack(">" + ("f" * 3), file.read(4 * 3))
-                xyz = struct.unpack(">" + ("f" * 3), file.read(4 * 3))
+                    # Skip the SLAN token, object size and time
+                    slan = _SLAN_STRUCT.unpack_from(buf, pos + 12)
 
-                results.append({"angles": angles, "coords": xyz})
-                file.read(32)
+                    results.append({"angles": slan[:3], "coords": slan[3:]})
 
-                # Read forward a little so next iteration of while loop starts at end of SLAN object
-                file.read(3)
-            elif token == b"OBJT":
-                # Objects are 176 bytes; skip path to make reading faster
-                file.read(176)
-                # Read forward a little so next iteration of while loop starts at end of object
-                file.read(3)
+                    # Continue scanning at the end of the SLAN object
+                    pos += 68
+                else:
+                    # Objects are 180 bytes including the token; skip past to make reading faster
+                    pos += 180
 
     if len(results) == 0:
         print("Reached end of MOD file without finding slicer angles!")
@@ -431,11 +493,12 @@ def imod_processor_to_i3(root, name, i3_args):
 
             # Copy over the tomogram to the maps folder
             if os.path.exists(os.path.join(tomogram_dir, rec)):
-                shutil.copyfile(
+                _copy_file(
                     os.path.join(root, tomogram_dir, rec),
                     os.path.join(
                         maps_path, check_and_fix_names_starting_with_numbers(rec)
                     ),
+                    link=i3_args.get("link_tomograms", False),
                 )
             else:
                 print(
@@ -567,8 +630,8 @@ def imod_real_to_i3(name, i3_args):
                     mod = file
                 elif i3_args["tlt_contains"] in file and file.endswith(".tlt"):
                     tlt = file
-                elif i3_args["rec_contains"] in file and (
-                    file.endswith(".mrc") or file.endswith(".rec")
+                elif i3_args["rec_contains"] in file and file.endswith(
+                    (".mrc", ".rec")
                 ):
                     rec = file
 
@@ -581,11 +644,12 @@ def imod_real_to_i3(name, i3_args):
 
             # Copy over the tomogram to the maps folder
             if rec != "":
-                shutil.copyfile(
+                _copy_file(
                     os.path.join(root, subdir, rec),
                     os.path.join(
                         maps_path, check_and_fix_names_starting_with_numbers(rec)
                     ),
+                    link=i3_args.get("link_tomograms", False),
                 )
             else:
                 print(
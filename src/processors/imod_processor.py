@@ -232,17 +232,14 @@ def set_up_batchtomo(root, name, imod_args):
     batchtomo_templates = template_path + "/batchtomo_files"
 
     print("Setting up IMOD data directories...")
-    directory = os.fsencode(raw_data)
-    for base_folder in os.listdir(directory):
-        base = os.fsdecode(base_folder)
+    for base in os.listdir(raw_data):
         if base.startswith(imod_args["data_dirs_start_with"]):
+            data_dir = os.path.join(raw_data, base)
             raw_stack = ""
             new_base = ""
-            for f in os.listdir(raw_data + "/" + base):
+            for f in os.listdir(data_dir):
                 # Look for map for the raw stack
-                if (f.endswith(".mrc") or f.endswith(".st")) and not f.endswith(
-                    "nonoise.mrc"
-                ):
+                if f.endswith((".mrc", ".st")) and not f.endswith("nonoise.mrc"):
                     raw_stack = f
                     new_base = os.path.splitext(f)[0]
                     break
@@ -250,7 +247,8 @@ def set_up_batchtomo(root, name, imod_args):
                 print("ERROR: No .st or .mrc found in %s to use for raw stack" % base)
                 exit(1)
 
-            new_tilt_folder = imod_project_dir + "/%s" % new_base
+            new_tilt_folder = os.path.join(imod_project_dir, new_base)
+            new_base_path = os.path.join(new_tilt_folder, base)
             if not os.path.exists(new_tilt_folder):
                 os.mkdir(new_tilt_folder)
 
@@ -258,31 +256,25 @@ def set_up_batchtomo(root, name, imod_args):
             # We are copying over our own versions of the outputs of coarse alignment in IMOD
             # since we want to skip that step.
             shutil.copyfile(
-                raw_data + "/" + base + "/" + raw_stack,
-                new_tilt_folder + "/" + base + ".mrc",
+                os.path.join(data_dir, raw_stack),
+                new_base_path + ".mrc",
             )
 
             # Simulated data needs to skip coarse alignment, so copy over fake outputs for it
             if not imod_args["real_data_mode"]:
                 shutil.copyfile(
-                    raw_data + "/" + base + "/" + raw_stack,
-                    get_imod_filename(
-                        new_tilt_folder + "/" + base, ".preali", filename_convention
-                    ),
+                    os.path.join(data_dir, raw_stack),
+                    get_imod_filename(new_base_path, ".preali", filename_convention),
                 )
 
-                for template_file in os.listdir(template_path):
-                    template = os.fsdecode(template_file)
-
+                for template in os.listdir(template_path):
                     # Copy over all the IMOD coarse alignment files so that we can fake that we've
                     # done it and can skip it. These are the .prexf, .prexg, and .rawtlt files.
                     if template.startswith("name"):
                         ext = os.path.splitext(template)[1]
                         shutil.copyfile(
-                            template_path + "/" + template,
-                            get_imod_filename(
-                                new_tilt_folder + "/" + base, ext, filename_convention
-                            ),
+                            os.path.join(template_path, template),
+                            get_imod_filename(new_base_path, ext, filename_convention),
                         )
 
     if not imod_args["real_data_mode"]:
@@ -303,25 +295,23 @@ def set_up_batchtomo(root, name, imod_args):
         replace_adoc_values(new_main_adoc, imod_args)
 
     print("Copying in batchtomo files...")
-    directory = os.fsencode(imod_project_dir)
     batchtomo_infos = []
-    for base_folder in os.listdir(directory):
-        base = os.fsdecode(base_folder)
+    for base in os.listdir(imod_project_dir):
         if (
             not base.startswith("batch")
             and not base.startswith(".")
             and not base.startswith("etomo")
         ):
             # Copy over individual sub-directory adoc files
+            tilt_folder = os.path.join(imod_project_dir, base)
             batch_file = ("%s_name.adoc" % batchtomo_name).replace("name", base)
-            this_adoc = "%s/%s/%s" % (imod_project_dir, base, batch_file)
+            this_adoc = os.path.join(tilt_folder, batch_file)
             shutil.copyfile(new_main_adoc, this_adoc)
 
             # Look for stack
             stack = ""
-            for file in os.listdir(os.fsencode("%s/%s" % (imod_project_dir, base))):
-                filename = os.fsdecode(file)
-                if filename.endswith(".mrc") or filename.endswith(".st"):
+            for filename in os.listdir(tilt_folder):
+                if filename.endswith((".mrc", ".st")):
                     # Prioritize .st files over .mrc for when re-processing data that already has
                     # tomogram MRC's inside the folder
                     if stack == "" or filename.endswith(".st"):
@@ -329,9 +319,9 @@ def set_up_batchtomo(root, name, imod_args):
 
             batchtomo_info = {
                 "root": stack.split(".")[0].replace("_preali", ""),
-                "tilt_folder": "%s/%s" % (imod_project_dir, base),
+                "tilt_folder": tilt_folder,
                 "adoc": this_adoc,
-                "stack": "%s/%s/%s" % (imod_project_dir, base, stack),
+                "stack": os.path.join(tilt_folder, stack),
             }
             batchtomo_infos.append(batchtomo_info)
 
@@ -1,3 +1,57 @@
+import numpy as np
+
+
+class _RowBuffer:
+    """A growable (N, 3) float array, which doubles its capacity when full the way a list does.
+
+    Rows are written in place into preallocated storage, and the filled rows are exposed as a view
+    so consumers can operate on the whole set at once.
+
+    """
+
+    __slots__ = ("_data", "_size")
+
+    def __init__(self, capacity=16):
+        self._data = np.empty((capacity, 3), dtype=np.float64)
+        self._size = 0
+
+    def _reserve(self, size):
+        """Grow the backing storage so that it can hold at least size rows"""
+        capacity = self._data.shape[0]
+        if size <= capacity:
+            return
+
+        while capacity < size:
+            capacity *= 2
+        data = np.empty((capacity, 3), dtype=np.float64)
+        data[: self._size] = self._data[: self._size]
+        self._data = data
+
+    def append(self, row):
+        """Append a single (x, y, z) row"""
+        self._reserve(self._size + 1)
+        self._data[self._size] = row
+        self._size += 1
+
+    def extend(self, rows):
+        """Append an (N, 3) array or list of rows in a single copy"""
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, 3)
+        self._reserve(self._size + len(rows))
+        self._data[self._size : self._size + len(rows)] = rows
+        self._size += len(rows)
+
+    def clear(self):
+        """Empty the buffer while keeping its allocated capacity"""
+        self._size = 0
+
+    def view(self):
+        """Return the filled rows as an (N, 3) view of the backing storage"""
+        return self._data[: self._size]
+
+    def __len__(self):
+        return self._size
+
+
 class ParticleSet:
     """Represents a set of particles of the same kind within a TEM-Simulator run.
 
@@ -8,10 +62,15 @@ class ParticleSet:
         name: The name of the particle (within the TEM-Simulator configurations) which this
             particle set consists of
         source: The source MRC or PDB file of the particle associated with the particle set
-        coordinates: A list of XYZ coordinates within the sample volume at which the particles in
-            the set should be located
-        orientations: A list of ZXZ Euler angles (external) to rotate the particles in the set.
-        num_particles: The number of particles in the set
+        coordinates_to_simulate: An (N, 3) array of XYZ coordinates within the sample volume at
+            which the particles in the set should be located
+        coordinates_to_save: An (N, 3) array of XYZ coordinates to record in the metadata
+        orientations_to_simulate: An (N, 3) array of ZXZ Euler angles (external) to rotate the
+            particles in the set.
+        orientations_to_save: An (N, 3) array of ZXZ Euler angles to record in the metadata
+        noisy_orientations: An (N, 3) array of noisy versions of the simulated orientations, to
+            record in the metadata instead of the true ones if any were given
+        num_particles: The number of particles in the set, derived from the simulated coordinates
         key: Flag to indicate that this is part of the particles of interest (the ones that will be
             averaged), versus say just fake gold fiducials added to facilitate processing
 
@@ -19,31 +78,78 @@ class ParticleSet:
         add_coordinate(coord): Append an XYZ coordinate to the list of particle coordinates
         add_orientation(orientation): Append an ZXZ Euler angle rotation to the list of particle
             orientations
+        add_particles(coordinates, orientations, ...): Append a batch of particles at once
         add_source(source): Set the particle source file for the particle set
+        acquire(name, key): Get a particle set, reusing a released one if available
+        release(): Return the particle set to be reused by a later acquire() call
+        as_arrays(): Return the (N, 3) coordinates and orientations to simulate, in lockstep
 
     """
 
+    __slots__ = (
+        "name",
+        "source",
+        "_coordinates_to_simulate",
+        "_coordinates_to_save",
+        "_orientations_to_simulate",
+        "_orientations_to_save",
+        "_noisy_orientations",
+        "key",
+    )
+
+    # Released instances available for reuse by acquire(). The pool is a class attribute, so it is
+    # per-process, and holds at most _MAX_FREE sets so that it cannot keep growing with the
+    # largest number of sets alive at once
+    _free = []
+    _MAX_FREE = 8
+
     def __init__(self, name, key=False):
         self.name = name
         self.source = None
-        self.coordinates_to_simulate = []
-        self.coordinates_to_save = []
-        self.orientations_to_simulate = []
-        self.orientations_to_save = []
-        self.noisy_orientations = []
-        self.num_particles = 0
+        self._coordinates_to_simulate = _RowBuffer()
+        self._coordinates_to_save = _RowBuffer()
+        self._orientations_to_simulate = _RowBuffer()
+        self._orientations_to_save = _RowBuffer()
+        self._noisy_orientations = _RowBuffer()
 
         # Flag to indicate that this is part of the particles of interest (the one that will be
         # averaged)
         self.key = key
 
+    @property
+    def num_particles(self):
+        return len(self._coordinates_to_simulate)
+
+    def __len__(self):
+        return len(self._coordinates_to_simulate)
+
+    @property
+    def coordinates_to_simulate(self):
+        return self._coordinates_to_simulate.view()
+
+    @property
+    def coordinates_to_save(self):
+        return self._coordinates_to_save.view()
+
+    @property
+    def orientations_to_simulate(self):
+        return self._orientations_to_simulate.view()
+
+    @property
+    def orientations_to_save(self):
+        return self._orientations_to_save.view()
+
+    @property
+    def noisy_orientations(self):
+        return self._noisy_orientations.view()
+
     def add_coordinate_to_simulate(self, coord):
         """Append an XYZ coordinate to the list of particle coordinates to simulate"""
-        self.coordinates_to_simulate.append(coord)
+        self._coordinates_to_simulate.append(coord)
 
     def add_coordinate_to_save(self, coord):
         """Append an XYZ coordinate to the list of particle coordinates to record"""
-        self.coordinates_to_save.append(coord)
+        self._coordinates_to_save.append(coord)
 
     def add_orientation_to_simulate(self, orientation, noisy_version=None):
         """
@@ -56,9 +162,9 @@ class ParticleSet:
         Returns: None
 
         """
-        self.orientations_to_simulate.append(orientation)
+        self._orientations_to_simulate.append(orientation)
         if noisy_version:
-            self.noisy_orientations.append(noisy_version)
+            self._noisy_orientations.append(noisy_version)
 
     def add_orientation_to_save(self, orientation):
         """
@@ -71,8 +177,91 @@ class ParticleSet:
         Returns: None
 
         """
-        self.orientations_to_save.append(orientation)
+        self._orientations_to_save.append(orientation)
+
+    def add_particles(
+        self,
+        coordinates,
+        orientations,
+        coordinates_to_save=None,
+        orientations_to_save=None,
+        noisy_orientations=None,
+    ):
+        """
+        Append a batch of particles to the set at once, instead of one add_* call per particle.
+
+        Args:
+            coordinates: A list or (N, 3) array of XYZ coordinates to simulate
+            orientations: A list or (N, 3) array of ZXZ orientations to simulate
+            coordinates_to_save: A list or (N, 3) array of XYZ coordinates to record, if any
+            orientations_to_save: A list or (N, 3) array of ZXZ orientations to record, if any
+            noisy_orientations: A list or (N, 3) array of noisy versions of the orientations to
+                record for processing purposes, if any
+
+        Returns: None
+
+        """
+        self._coordinates_to_simulate.extend(coordinates)
+        self._orientations_to_simulate.extend(orientations)
+        if coordinates_to_save is not None:
+            self._coordinates_to_save.extend(coordinates_to_save)
+        if orientations_to_save is not None:
+            self._orientations_to_save.extend(orientations_to_save)
+        if noisy_orientations is not None:
+            self._noisy_orientations.extend(noisy_orientations)
 
     def add_source(self, source):
         """Set the particle source file for the particle set"""
         self.source = source
+
+    def as_arrays(self):
+        """
+        Get the particles to simulate as parallel arrays, so they can be processed array-at-a-time
+            instead of zipping over individual particles
+
+        Returns: A tuple of the (N, 3) coordinates and (N, 3) orientations to simulate
+
+        """
+        return self.coordinates_to_simulate, self.orientations_to_simulate
+
+    @classmethod
+    def acquire(cls, name, key=False):
+        """
+        Get an empty particle set, reusing a previously released instance (and the capacity of its
+            arrays) when one is available instead of allocating a new one
+
+        Args:
+            name: The name of the particle which this particle set consists of
+            key: Flag to indicate that this is part of the particles of interest
+
+        Returns: An empty ParticleSet
+
+        """
+        if not cls._free:
+            return cls(name, key=key)
+
+        particle_set = cls._free.pop()
+        particle_set.name = name
+        particle_set.key = key
+        particle_set.source = None
+        particle_set._coordinates_to_simulate.clear()
+        particle_set._coordinates_to_save.clear()
+        particle_set._orientations_to_simulate.clear()
+        particle_set._orientations_to_save.clear()
+        particle_set._noisy_orientations.clear()
+        return particle_set
+
+    def release(self):
+        """
+        Return the particle set to the pool of this process for reuse. The set and any arrays
+            obtained from it must not be used after releasing it, since a later acquire() call
+            will clear and refill them. If the pool is already full, the set is simply dropped.
+
+        Returns: None
+
+        """
+        # Releasing the same set twice would let two acquire() calls share it
+        if len(self._free) < self._MAX_FREE and not any(
+            particle_set is self for particle_set in self._free
+        ):
+            self._free.append(self)
@@ -11,6 +11,8 @@ from subprocess import check_output
 import random
 import logging
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
 
@@ -99,10 +101,10 @@ class Simulation:
         Extend the positions attribute with a given list of positions
 
         Args:
-            positions: A list of positions (X, Y, Z) to extend the positions list by
+            positions: A list or (N, 3) array of positions (X, Y, Z) to extend the positions list by
 
         """
-        self.positions.extend(positions)
+        self.positions.extend(np.asarray(positions).tolist())
 
     def add_orientation(self, orientation):
         """
@@ -119,11 +121,11 @@ class Simulation:
         Extend the orientations attribute with a given list of orientations
 
         Args:
-            orientations: A list of extrinsic Euler angles (z1, x, z2) to extend the orientations
-                list by
+            orientations: A list or (N, 3) array of extrinsic Euler angles (z1, x, z2) to extend
+                the orientations list by
 
         """
-        self.orientations.extend(orientations)
+        self.orientations.extend(np.asarray(orientations).tolist())
 
     def set_custom_data(self, data):
         """
@@ -422,8 +424,9 @@ class Simulation:
             if particle_set.key:
                 # Record (for metadata) noisy versions of the orientations if they exist, otherwise
                 # the true ones
-                if particle_set.noisy_orientations:
-                    self.extend_orientations(particle_set.noisy_orientations)
+                noisy_orientations = particle_set.noisy_orientations
+                if noisy_orientations is not None and len(noisy_orientations) > 0:
+                    self.extend_orientations(noisy_orientations)
                 else:
                     self.extend_orientations(particle_set.orientations_to_save)
 
@@ -0,0 +1,38 @@
+import os
+from processors import artiatomi_processor as artia
+
+
+def test_artiatomi_main_refinement_only_real_data(tmpdir, mocker):
+    # A real data config that only sets up refinement does not need the dir_starts_with parameter
+    mock_generate = mocker.patch.object(artia, "generate_refinement_script")
+    mock_extract = mocker.patch.object(artia, "generate_extract_script")
+    artia_dir = str(tmpdir)
+    artia_args = {
+        "real_data_mode": True,
+        "artia_dir": artia_dir,
+        "setup_refinement": True,
+    }
+
+    artia.artiatomi_main("unused_root", "unused_name", artia_args)
+
+    assert os.path.isdir(os.path.join(artia_dir, "refine", "motls"))
+    mock_generate.assert_called_once_with(
+        artia_dir, os.path.join(artia_dir, "tomo_motls.txt"), artia_args
+    )
+    mock_extract.assert_called_once_with(artia_dir, artia_args)
+
+
+def test_get_latest_ref_and_motl_use_numeric_order(tmpdir):
+    # ref10 sorts before ref2 and ref3 by name, so only a numeric comparison picks it
+    sta_dir = tmpdir.mkdir("sta")
+    ref_dir = sta_dir.mkdir("ref")
+    for name in ("ref2.em", "ref10.em", "ref3.em", "ref_notes.txt"):
+        ref_dir.join(name).write("")
+    motls_dir = sta_dir.mkdir("motls")
+    for name in ("motl_1.em", "motl_12.em", "motl_12.em.bak"):
+        motls_dir.join(name).write("")
+
+    assert artia.get_latest_ref(str(sta_dir)) == os.path.join(str(ref_dir), "ref10.em")
+    assert artia.get_latest_motl(str(sta_dir)) == os.path.join(
+        str(motls_dir), "motl_12.em"
+    )
@@ -0,0 +1,45 @@
+import warnings
+import numpy as np
+from scipy.spatial.transform import Rotation as R
+from processors import dynamo_processor as dynamo
+
+
+def scipy_slicer_angles_to_dynamo_angles(angles):
+    # The SciPy conversion the closed-form version replaced
+    rot = R.from_euler("zyx", np.asarray(angles)[:, ::-1], degrees=True)
+    peet = (
+        (R.from_euler("zxz", [0, 90, 0], degrees=True) * rot)
+        .inv()
+        .as_euler("zxz", degrees=True)
+    )
+    return -peet[:, ::-1]
+
+
+def test_slicer_angles_to_dynamo_angles_batch_matches_scipy():
+    rng = np.random.default_rng(0)
+    angles = np.concatenate(
+        [
+            rng.uniform(-180, 180, size=(200, 3)),
+            # Identity and gimbal lock orientations, where only the rotation itself is unique
+            [[0, 0, 0], [0, 90, 0], [0, -90, 0], [-90, 0, 0], [90, 0, 45]],
+        ]
+    )
+
+    with warnings.catch_warnings():
+        # SciPy warns about the gimbal lock cases
+        warnings.simplefilter("ignore", UserWarning)
+        expected = scipy_slicer_angles_to_dynamo_angles(angles)
+    actual = dynamo.slicer_angles_to_dynamo_angles_batch(angles)
+
+    # Both sets of angles must describe the same rotations
+    assert np.allclose(
+        R.from_euler("zxz", actual, degrees=True).as_matrix(),
+        R.from_euler("zxz", expected, degrees=True).as_matrix(),
+        atol=1e-9,
+    )
+
+    # Away from gimbal lock (a tilt of 0 or 180) the angles themselves agree, up to a wrap of 360
+    # degrees, e.g. tdrot comes out as -180 rather than 180 for the identity orientation
+    unlocked = np.abs(np.sin(np.radians(expected[:, 1]))) > 1e-6
+    wrapped_difference = (actual - expected + 180) % 360 - 180
+    assert np.allclose(wrapped_difference[unlocked], 0, atol=1e-9)
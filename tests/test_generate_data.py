@@ -3,6 +3,9 @@ import yaml
 import ets_generate_data as ets
 import io
 from shutil import rmtree
+import os
+import stat
+import tarfile
 
 
 @pytest.fixture(scope="module")
@@ -121,3 +124,26 @@ def test_project(
     assert "Got completion signal from process 1" in captured.out
     assert "Joined Chimera server processes" in captured.out
     assert "Total time taken:" in captured.out
+
+
+def test_pack_templates(tmpdir, base_test_config, base_test_coords):
+    # Read-only templates must still be extractable over the previous temp copies
+    test_tem_configs = tmpdir.join("sim.txt")
+    test_tem_coords = tmpdir.join("coords.txt")
+    test_tem_configs.write(base_test_config)
+    test_tem_coords.write(base_test_coords)
+    test_tem_configs.chmod(0o444)
+    test_tem_coords.chmod(0o444)
+
+    templates_tar_path = str(tmpdir.join("templates.tar"))
+    ets.pack_templates(str(test_tem_coords), str(test_tem_configs), templates_tar_path)
+
+    temp_dir = tmpdir.mkdir("temp")
+    with tarfile.open(templates_tar_path, "r") as templates_tar:
+        for _ in range(2):
+            templates_tar.extractall(path=str(temp_dir), **ets.templates_extract_args)
+
+    assert temp_dir.join("sim.txt").read() == base_test_config
+    assert temp_dir.join("coord.txt").read() == base_test_coords
+    assert stat.S_IMODE(os.stat(str(temp_dir.join("sim.txt"))).st_mode) == 0o644
+    assert stat.S_IMODE(os.stat(str(temp_dir.join("coord.txt"))).st_mode) == 0o644
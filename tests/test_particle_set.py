@@ -0,0 +1,198 @@
+import pytest
+import numpy as np
+from simulation import tem_simulation as simulation
+from simulation.particle_set import ParticleSet
+
+
+def make_simulation(directory):
+    test_config_file = directory.join("test.txt")
+    test_config_file.write("=== simulation ===\n" + "log_file = old_log_file.txt\n")
+
+    test_base_coords_file = directory.join("coords.txt")
+    test_base_coords_file.write("2 6\n0 0 0 0 0 0\n100 100 100 0 0 0\n")
+
+    return simulation.Simulation(
+        str(test_config_file),
+        str(test_base_coords_file),
+        "new_test_tiltseries.mrc",
+        "new_test_tiltseries_nonoise.mrc",
+        0,
+        str(directory),
+        apix=1,
+    )
+
+
+@pytest.fixture
+def fresh_simulation(tmpdir):
+    # Each test gets its own simulation, since create_particle_lists appends to the config file and
+    # the metadata
+    return make_simulation(tmpdir)
+
+
+def read_coord_file(sim, name):
+    with open("%s/%s_coord.txt" % (sim.temp_dir, name), "r") as f:
+        return f.read()
+
+
+def test_particle_set_grows_past_initial_capacity():
+    particle_set = ParticleSet("test_name")
+    num_particles = 40
+    for i in range(num_particles):
+        particle_set.add_coordinate_to_simulate([i, i + 1, i + 2])
+        particle_set.add_orientation_to_simulate([i, 2 * i, 3 * i])
+
+    assert particle_set.num_particles == num_particles
+    assert len(particle_set) == num_particles
+
+    # Rows written before the storage grew must survive the copies into the larger arrays
+    expected_coordinates = [[i, i + 1, i + 2] for i in range(num_particles)]
+    expected_orientations = [[i, 2 * i, 3 * i] for i in range(num_particles)]
+    assert particle_set.coordinates_to_simulate.tolist() == expected_coordinates
+    assert particle_set.orientations_to_simulate.tolist() == expected_orientations
+
+
+def test_particle_set_views():
+    particle_set = ParticleSet("test_name")
+    assert particle_set.coordinates_to_simulate.shape == (0, 3)
+    assert particle_set.orientations_to_save.shape == (0, 3)
+
+    particle_set.add_coordinate_to_simulate([1, 2, 3])
+    particle_set.add_coordinate_to_save([4, 5, 6])
+    particle_set.add_orientation_to_simulate([7, 8, 9])
+    particle_set.add_orientation_to_save([10, 11, 12])
+
+    for array in (
+        particle_set.coordinates_to_simulate,
+        particle_set.coordinates_to_save,
+        particle_set.orientations_to_simulate,
+        particle_set.orientations_to_save,
+    ):
+        assert array.shape == (1, 3)
+        assert array.dtype == np.float64
+
+    coordinates, orientations = particle_set.as_arrays()
+    assert coordinates.tolist() == [[1, 2, 3]]
+    assert orientations.tolist() == [[7, 8, 9]]
+
+
+def test_particle_set_noisy_orientations():
+    particle_set = ParticleSet("test_name")
+    particle_set.add_orientation_to_simulate([1, 2, 3])
+    assert len(particle_set.noisy_orientations) == 0
+
+    particle_set.add_orientation_to_simulate([4, 5, 6], noisy_version=[4.5, 5.5, 6.5])
+    assert particle_set.noisy_orientations.tolist() == [[4.5, 5.5, 6.5]]
+
+
+def test_create_particle_lists_from_particle_set(fresh_simulation):
+    particle_set = ParticleSet("test_name", key=True)
+    particle_set.add_source("test_model_source.mrc")
+    for coordinate, orientation in (
+        ([0, 0, 0], [0, 0, 0]),
+        ([10, 20, 30], [90, 45, 30]),
+    ):
+        particle_set.add_coordinate_to_simulate(coordinate)
+        particle_set.add_coordinate_to_save(coordinate)
+        particle_set.add_orientation_to_simulate(orientation)
+        particle_set.add_orientation_to_save(orientation)
+
+    fresh_simulation.create_particle_lists([particle_set])
+
+    assert read_coord_file(fresh_simulation, "test_name") == (
+        "2 6\n0 0 0 0 0 0\n10 20 30 90 45 30\n"
+    )
+    assert fresh_simulation.positions == [[0, 0, 0], [10, 20, 30]]
+    assert fresh_simulation.orientations == [[0, 0, 0], [90, 45, 30]]
+
+
+def test_add_particles_matches_per_particle_calls(tmpdir):
+    coordinates = [[0, 0, 0], [10, 20, 30], [40, 50, 60]]
+    saved_coordinates = [[1, 1, 1], [11, 21, 31], [41, 51, 61]]
+    orientations = [[0, 0, 0], [90, 45, 30], [180, 90, 270]]
+    noisy_orientations = [[1, 2, 3], [91, 46, 31], [181, 91, 271]]
+
+    # Build one set the old way, one particle at a time, with noisy orientations and so no
+    # orientations to save
+    per_particle_set = ParticleSet("test_name", key=True)
+    per_particle_set.add_source("test_model_source.mrc")
+    for i in range(len(coordinates)):
+        per_particle_set.add_orientation_to_simulate(
+            orientations[i], noisy_version=noisy_orientations[i]
+        )
+        per_particle_set.add_coordinate_to_simulate(coordinates[i])
+        per_particle_set.add_coordinate_to_save(saved_coordinates[i])
+
+    # And the same set with a single bulk call
+    bulk_set = ParticleSet("test_name", key=True)
+    bulk_set.add_source("test_model_source.mrc")
+    bulk_set.add_particles(
+        coordinates,
+        orientations,
+        coordinates_to_save=saved_coordinates,
+        orientations_to_save=[],
+        noisy_orientations=noisy_orientations,
+    )
+
+    per_particle_simulation = make_simulation(tmpdir.mkdir("per_particle"))
+    per_particle_simulation.create_particle_lists([per_particle_set])
+    bulk_simulation = make_simulation(tmpdir.mkdir("bulk"))
+    bulk_simulation.create_particle_lists([bulk_set])
+
+    assert read_coord_file(bulk_simulation, "test_name") == read_coord_file(
+        per_particle_simulation, "test_name"
+    )
+    assert bulk_simulation.orientations == per_particle_simulation.orientations
+    assert bulk_simulation.orientations == noisy_orientations
+    assert bulk_simulation.positions == per_particle_simulation.positions
+
+    # The config files only differ by the temp directory in the coord file path
+    with open(per_particle_simulation.config_file, "r") as f:
+        per_particle_config = f.read().replace(per_particle_simulation.temp_dir, "")
+    with open(bulk_simulation.config_file, "r") as f:
+        bulk_config = f.read().replace(bulk_simulation.temp_dir, "")
+    assert bulk_config == per_particle_config
+
+
+def test_released_particle_set_is_reacquired_empty(monkeypatch):
+    monkeypatch.setattr(ParticleSet, "_free", [])
+
+    particle_set = ParticleSet.acquire("old_name", key=True)
+    particle_set.add_source("old_source.mrc")
+    particle_set.add_particles(
+        [[1, 2, 3]] * 20,
+        [[4, 5, 6]] * 20,
+        coordinates_to_save=[[1, 2, 3]] * 20,
+        orientations_to_save=[[4, 5, 6]] * 20,
+        noisy_orientations=[[7, 8, 9]] * 20,
+    )
+    particle_set.release()
+
+    reacquired = ParticleSet.acquire("new_name")
+    assert reacquired is particle_set
+    assert reacquired.name == "new_name"
+    assert reacquired.key is False
+    assert reacquired.source is None
+    assert reacquired.num_particles == 0
+    for array in (
+        reacquired.coordinates_to_simulate,
+        reacquired.coordinates_to_save,
+        reacquired.orientations_to_simulate,
+        reacquired.orientations_to_save,
+        reacquired.noisy_orientations,
+    ):
+        assert array.shape == (0, 3)
+
+
+def test_particle_set_pool_is_bounded(monkeypatch):
+    monkeypatch.setattr(ParticleSet, "_free", [])
+
+    particle_sets = [ParticleSet.acquire("test_name") for _ in range(20)]
+    for particle_set in particle_sets:
+        particle_set.release()
+    assert len(ParticleSet._free) == ParticleSet._MAX_FREE
+
+    # Releasing a set twice must not let two acquire() calls hand out the same set
+    ParticleSet._free.clear()
+    particle_sets[0].release()
+    particle_sets[0].release()
+    assert ParticleSet.acquire("a") is not ParticleSet.acquire("b")